@@ -5,10 +5,37 @@ import subprocess
 import platform
 import heapq
 import sys
+from functools import lru_cache
 from nltk.stem import PorterStemmer, LancasterStemmer
 
+
+class MemoStemmer:
+    """Envuelve un stemmer de NLTK con una cache LRU acotada de palabra -> raiz."""
+
+    def __init__(self, stemmer, maxsize=100000):
+        self.stemmer = stemmer
+        self.stem = lru_cache(maxsize=maxsize)(stemmer.stem)
+        self.term_count = 0
+
+    @property
+    def name(self):
+        return self.stemmer.__class__.__name__
+
+    def hit_rate(self) -> float:
+        info = self.stem.cache_info()
+        total = info.hits + info.misses
+        return info.hits / total if total else 0.0
+
+    def report(self):
+        info = self.stem.cache_info()
+        print(
+            f"Cache {self.name}: {info.hits} hits, {info.misses} misses, "
+            f"{info.currsize}/{info.maxsize} entradas, hit rate {self.hit_rate():.2%}"
+        )
+
+
 class TextProcessor:
-    def __init__(self, file):
+    def __init__(self, file, memo_size=100000):
         self.file = file
 
         self.json_porter_file = "porter.json"
@@ -18,11 +45,8 @@ class TextProcessor:
         self.token_count = 0
         self.doc_count = 0
 
-        self.porter_stemmer = PorterStemmer()
-        self.lancaster_stemmer = LancasterStemmer()
-
-        self.porter_stemmer.term_count = 0
-        self.lancaster_stemmer.term_count = 0
+        self.porter_stemmer = MemoStemmer(PorterStemmer(), memo_size)
+        self.lancaster_stemmer = MemoStemmer(LancasterStemmer(), memo_size)
         
         self.json_porter_data = self.load_json(self.json_porter_file)
         self.json_lancaster_data = self.load_json(self.json_lancaster_file)
@@ -45,6 +69,8 @@ class TextProcessor:
 
     def process_text(self):
         pattern = r"<DOCNO>\s*([0-9]+)\s*</DOCNO>"
+        porter_data = self.json_porter_data["data"]
+        lancaster_data = self.json_lancaster_data["data"]
 
         with open(self.file) as trec_file:
             line = trec_file.readline().strip()
@@ -57,12 +83,12 @@ class TextProcessor:
                     docno = docno_match.group(1)
                     line = trec_file.readline().strip()
                 if line != "<\DOC>":
+                    # Un solo parseo del archivo alimenta a los dos stemmers.
                     tokens = self.clean_and_divide(line)
                     for token in tokens:
                         self.token_count += 1
-                        print(f"Token: {token}")
-                        self.update_json_in_memory(self.json_porter_data["data"], token, docno, 1, self.porter_stemmer)
-                        self.update_json_in_memory(self.json_lancaster_data["data"], token, docno, 1, self.lancaster_stemmer)
+                        self.update_json_in_memory(porter_data, token, docno, 1, self.porter_stemmer)
+                        self.update_json_in_memory(lancaster_data, token, docno, 1, self.lancaster_stemmer)
                     line = trec_file.readline().strip()
         self.save_json(self.json_porter_file, self.json_porter_data)
         self.save_json(self.json_lancaster_file, self.json_lancaster_data)
@@ -110,8 +136,6 @@ class TextProcessor:
 
         stemmer.term_count += 1
 
-        print(f"Stemmed by {stemmer.__class__.__name__}: {stemmed_term}")
-
         if stemmed_term not in data:
             data[stemmed_term] = {
                 "palabra": stemmed_term, "df": 0, "apariciones": {}
@@ -159,3 +183,5 @@ if __name__ == "__main__":
 
     processor = TextProcessor(file_corpus)
     processor.process_text()
+    processor.porter_stemmer.report()
+    processor.lancaster_stemmer.report()
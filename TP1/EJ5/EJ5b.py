@@ -7,10 +7,11 @@ import heapq
 import sys
 import time
 from nltk.stem import PorterStemmer, LancasterStemmer
+from EJ5 import MemoStemmer
 
 
 class TextProcessor:
-    def __init__(self, file: str, stemmer_type: str):
+    def __init__(self, file: str, stemmer_type: str, memo_size: int = 0, load: bool = True):
         self.file = file
         self.token_count = 0
         self.doc_count = 0
@@ -24,8 +25,13 @@ class TextProcessor:
         else:
             print("Elija un stemmer valido")
             sys.exit(1)
+
+        # memo_size = 0 corresponde a la version original, sin cache.
+        if memo_size > 0:
+            self.stemmer = MemoStemmer(self.stemmer, memo_size)
         
-        self.json_data = self.load_json()
+        # load=False arranca sin los datos del JSON de corridas anteriores.
+        self.json_data = self.load_json() if load else {}
 
         if "data" not in self.json_data:
             self.json_data["data"] = {}
@@ -39,7 +45,7 @@ class TextProcessor:
             self.token_count += 1
         return aux
 
-    def process_text(self):
+    def process_text(self, save: bool = True):
         pattern = r"<DOCNO>\s*([0-9]+)\s*</DOCNO>"
 
         with open(self.file) as trec_file:
@@ -58,8 +64,9 @@ class TextProcessor:
                         self.token_count += 1
                         self.update_json_in_memory(self.json_data["data"], token, docno, 1)
                     line = trec_file.readline().strip()
-        self.save_json()
-        self.save_json_statistics()
+        if save:
+            self.save_json()
+            self.save_json_statistics()
 
     def clean_and_divide(self,text):
         clean_text = re.sub(r'[^a-zA-Z0-9ÁÉÍÓÚáéíóúÑñ]', ' ', text)
@@ -144,11 +151,22 @@ if __name__ == "__main__":
         print(f"Error: El archivo '{file_corpus}' no existe.")
         sys.exit(1)
 
-    start_time = time.time()
+    # Benchmark antes/despues: la misma corrida sin cache y con cache de stems.
+    # Las dos arrancan sin datos previos y no leen ni escriben el JSON, asi que
+    # solo se mide el recorrido de los tokens.
+    times = {}
+    for label, memo_size in (("sin cache", 0), ("con cache", 100000)):
+        processor = TextProcessor(file_corpus, stemmer_type, memo_size, load=False)
+
+        start_time = time.perf_counter()
+        processor.process_text(save=False)
+        times[label] = time.perf_counter() - start_time
+
+        print(f"Tiempo de ejecución con {stemmer_type} stemmer ({label}): {times[label]:.2f} segundos")
+        if memo_size > 0:
+            processor.stemmer.report()
 
-    processor = TextProcessor(file_corpus, stemmer_type)
-    processor.process_text()
-    processor.save_json_statistics()
+    print(f"Speedup: {times['sin cache'] / times['con cache']:.2f}x")
 
-    end_time = time.time()
-    print(f"Tiempo de ejecución con {stemmer_type} stemmer: {end_time - start_time:.2f} segundos")
+    # Fuera del benchmark, la corrida normal que actualiza el JSON.
+    TextProcessor(file_corpus, stemmer_type, 100000).process_text()
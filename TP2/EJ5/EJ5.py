@@ -1,7 +1,9 @@
-from bs4 import BeautifulSoup
+# Se ejecuta como modulo desde la raiz del repositorio:
+#     python -m TP2.EJ5.EJ5 <directorio con los HTML>
+
 from pathlib import Path
 import argparse
-from tokenicer import TextProcessor
+from TP2.EJ5.tokenicer import TextProcessor
 import re
 from collections import Counter
 from collections import defaultdict
@@ -18,13 +20,9 @@ def directory_dfs(path: Path, textProcessor: TextProcessor) -> None:
         else:
             if (file_index % 250) == 0:
                 print(f"Procesando archivo: {file_index}")
-            with open(x, "r", encoding="utf-8") as f:
-                html = f.read()
-            soup = BeautifulSoup(html, features="html.parser")
-            for script in soup(["script", "style"]):
-                script.extract()
-            text = soup.get_text()
-            textProcessor.process_text(text, str(file_index))
+            # El HTML se lee de a bloques: extraccion y tokenizacion en streaming.
+            with open(x, "rb") as f:
+                textProcessor.process_stream(f, str(file_index))
             file_index += 1
 
 
@@ -3,9 +3,10 @@ import platform
 import heapq
 import tempfile
 import subprocess
-from collections import defaultdict
-import nltk
-from nltk.corpus import stopwords
+from collections import defaultdict, Counter
+from TP4.EJ1.stopwords import get_stopwords
+from TP4.EJ1.tokenicer import iter_tokens_stream
+from TP4.EJ1.extractors import StreamingExtractor
 
 
 class TextProcessor:
@@ -17,8 +18,7 @@ class TextProcessor:
             )
         self.statistics = {"N": 0, "num_terms": 0, "num_tokens": 0}
 
-        nltk.download("stopwords", quiet=True)
-        self.stopwords = set(stopwords.words("spanish"))
+        self.stopwords = get_stopwords("spanish")
 
     def process_text(self, text: str, docID: str):
         sorted_words = self.sort_words(text)
@@ -37,6 +37,23 @@ class TextProcessor:
 
         self.doc_count += 1
 
+    def process_stream(self, stream, docID: str, block_size=1 << 16):
+        # Igual que process_text sobre el texto extraido del HTML, pero leyendo
+        # el documento por bloques desde un archivo (texto o binario), sin
+        # cargarlo entero en memoria.
+        counts = Counter()
+        text = StreamingExtractor().iter_text(stream, block_size)
+        for word in iter_tokens_stream(text):
+            self.token_count += 1
+            if word not in self.stopwords:
+                counts[word] += 1
+
+        doc_terms = set()
+        for word, term_count in counts.items():
+            self.update_json_in_memory(word, docID, term_count, doc_terms)
+
+        self.doc_count += 1
+
     def sort_words(self, text):
         if platform.system() == "Windows":
             return self.sort_words_windows(text)
@@ -0,0 +1,55 @@
+import mmap
+import os
+import numpy as np
+
+
+# Almacen de nombres de documento indexado por doc_id: un arreglo de offsets
+# uint64 (N + 1 entradas) y un blob con los nombres en UTF-8 concatenados.
+# El nombre del documento i esta en blob[offsets[i] : offsets[i + 1]].
+
+
+def write_docnames(offsets_path, blob_path, names):
+    offsets = [0]
+    with open(blob_path, "wb") as blob:
+        for name in names:
+            data = name.encode("utf-8")
+            blob.write(data)
+            offsets.append(offsets[-1] + len(data))
+    np.array(offsets, dtype=np.uint64).tofile(offsets_path)
+
+
+class DocnameStore:
+    # Ambos archivos se mapean en memoria, asi que abrir el almacen no depende
+    # de la cantidad de documentos y solo se leen las paginas que se consultan.
+    def __init__(self, offsets_path, blob_path):
+        self.offsets = np.memmap(offsets_path, dtype=np.uint64, mode="r")
+        if os.path.getsize(blob_path) > 0:
+            with open(blob_path, "rb") as f:
+                self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.blob = b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, doc_id):
+        if not 0 <= doc_id < len(self):
+            raise KeyError(doc_id)
+        start = int(self.offsets[doc_id])
+        end = int(self.offsets[doc_id + 1])
+        return self.blob[start:end].decode("utf-8")
+
+    def get(self, doc_id, default=None):
+        try:
+            return self[doc_id]
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        for doc_id in range(len(self)):
+            yield self[doc_id]
+
+    def named_count(self):
+        # Cantidad de doc_ids con nombre (los indices con huecos en los doc_id
+        # guardan un nombre vacio para los que no existen).
+        return int(np.count_nonzero(np.diff(self.offsets)))
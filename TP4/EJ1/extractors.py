@@ -0,0 +1,225 @@
+from html.parser import HTMLParser
+import codecs
+from pathlib import Path
+
+
+# Tags cuyo contenido no es texto visible del documento.
+SKIP_TAGS = ("script", "style")
+
+# Campos que se indexan aparte ademas del texto completo, con los tags de
+# donde sale el texto de cada uno. El cuerpo es el texto completo.
+FIELD_TAGS = {
+    "title": ("title",),
+    "heading": ("h1", "h2", "h3", "h4", "h5", "h6"),
+}
+FIELDS = tuple(FIELD_TAGS)
+
+
+def field_term(field, term):
+    # Termino del indice para `term` dentro de `field`. Los tokens no tienen
+    # ':', asi que no se confunden con los terminos del texto completo.
+    return f"{field}:{term}"
+
+
+class TextExtractor:
+    name = ""
+
+    def extract(self, html: str) -> str:
+        raise NotImplementedError
+
+    def extract_file(self, path: Path) -> str:
+        with open(path, encoding="utf-8") as f:
+            return self.extract(f.read())
+
+    def extract_fields(self, html: str):
+        # Devuelve (texto completo, {campo: texto}) parseando el HTML una sola
+        # vez. Un extractor que no distingue campos los deja vacios.
+        return self.extract(html), {}
+
+    def extract_file_fields(self, path: Path):
+        with open(path, encoding="utf-8") as f:
+            return self.extract_fields(f.read())
+
+
+class SoupExtractor(TextExtractor):
+    # Comportamiento original: arma el arbol completo con BeautifulSoup.
+    name = "soup"
+
+    def extract(self, html: str) -> str:
+        return self._parse(html).get_text()
+
+    def extract_fields(self, html: str):
+        soup = self._parse(html)
+        # Un tag dentro de otro del mismo campo (un h3 dentro de un h2) ya esta
+        # en el texto del de afuera.
+        fields = {
+            field: " ".join(
+                tag.get_text() for tag in soup(tags) if tag.find_parent(tags) is None
+            )
+            for field, tags in FIELD_TAGS.items()
+        }
+        return soup.get_text(), fields
+
+    def _parse(self, html):
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, "html.parser")
+        for tag in soup(SKIP_TAGS):
+            tag.extract()
+        return soup
+
+
+_FIELD_OF_TAG = {tag: field for field, tags in FIELD_TAGS.items() for tag in tags}
+
+
+class _TextCollector(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip_depth = 0
+        # Texto de cada campo y cuantos tags de ese campo estan abiertos.
+        self.field_parts = {field: [] for field in FIELDS}
+        self.field_depth = dict.fromkeys(FIELDS, 0)
+        self.open_fields = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        field = _FIELD_OF_TAG.get(tag)
+        if field is not None:
+            if not self.field_depth[field]:
+                # Separa el texto de tags distintos del mismo campo.
+                self.field_parts[field].append(" ")
+            self.field_depth[field] += 1
+            self.open_fields += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self.skip_depth > 0:
+            self.skip_depth -= 1
+        field = _FIELD_OF_TAG.get(tag)
+        if field is not None and self.field_depth[field] > 0:
+            self.field_depth[field] -= 1
+            self.open_fields -= 1
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+            if self.open_fields:
+                for field, depth in self.field_depth.items():
+                    if depth:
+                        self.field_parts[field].append(data)
+
+    def unknown_decl(self, data):
+        # BeautifulSoup incluye las secciones CDATA en get_text().
+        if data.startswith("CDATA[") and not self.skip_depth:
+            self.parts.append(data[6:])
+
+
+class StreamingExtractor(TextExtractor):
+    # Recorre el HTML con html.parser sin construir ningun arbol. Igual que
+    # get_text(), concatena los textos sin separador y descarta comentarios,
+    # doctype y el contenido de script/style.
+    name = "stream"
+
+    def extract(self, html: str) -> str:
+        collector = _TextCollector()
+        collector.feed(html)
+        collector.close()
+        return "".join(collector.parts)
+
+    def extract_fields(self, html: str):
+        collector = _TextCollector()
+        collector.feed(html)
+        collector.close()
+        fields = {
+            field: "".join(parts) for field, parts in collector.field_parts.items()
+        }
+        return "".join(collector.parts), fields
+
+    def iter_text(self, stream, block_size=1 << 16):
+        # Version incremental: alimenta el parser de a bloques y devuelve el
+        # texto a medida que aparece, para combinar con iter_tokens_stream.
+        # `stream` puede ser un archivo de texto o binario; los bytes se
+        # decodifican como UTF-8 de forma incremental, asi que un caracter
+        # multibyte partido entre bloques no se pierde.
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        collector = _TextCollector()
+        while True:
+            block = stream.read(block_size)
+            if not block:
+                break
+            if isinstance(block, bytes):
+                block = decoder.decode(block)
+            collector.feed(block)
+            if collector.parts:
+                yield "".join(collector.parts)
+                collector.parts.clear()
+        collector.feed(decoder.decode(b"", final=True))
+        collector.close()
+        if collector.parts:
+            yield "".join(collector.parts)
+
+
+class LxmlExtractor(TextExtractor):
+    # Parser en C de lxml; solo se usa si lxml esta instalado. A diferencia de
+    # los otros dos, libxml2 descarta las secciones CDATA dentro de HTML.
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree
+
+        self.etree = etree
+        # Se le pasan bytes UTF-8: lxml rechaza un str que empiece con una
+        # declaracion XML con encoding (<?xml ... encoding="utf-8"?>), y con
+        # el encoding fijo se ignora el que declare la pagina.
+        self.parser = etree.HTMLParser(encoding="utf-8")
+
+    def extract(self, html: str) -> str:
+        root = self._parse(html)
+        if root is None:
+            return ""
+        return "".join(root.itertext())
+
+    def extract_fields(self, html: str):
+        root = self._parse(html)
+        if root is None:
+            return "", {field: "" for field in FIELDS}
+        fields = {
+            field: " ".join(
+                "".join(tag.itertext())
+                for tag in root.iter(*tags)
+                if next(tag.iterancestors(*tags), None) is None
+            )
+            for field, tags in FIELD_TAGS.items()
+        }
+        return "".join(root.itertext()), fields
+
+    def _parse(self, html):
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        root = self.etree.fromstring(html, self.parser)
+        if root is not None:
+            self.etree.strip_elements(
+                root, *SKIP_TAGS, self.etree.Comment, with_tail=False
+            )
+        return root
+
+
+EXTRACTORS = {
+    SoupExtractor.name: SoupExtractor,
+    StreamingExtractor.name: StreamingExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+}
+
+
+def get_extractor(name="auto") -> TextExtractor:
+    if isinstance(name, TextExtractor):
+        return name
+    if name == "auto":
+        try:
+            return LxmlExtractor()
+        except ImportError:
+            return StreamingExtractor()
+    if name not in EXTRACTORS:
+        raise ValueError(f"Extractor desconocido: {name}")
+    return EXTRACTORS[name]()
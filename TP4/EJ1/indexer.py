@@ -1,53 +1,308 @@
 import time
-from bs4 import BeautifulSoup
 from pathlib import Path
-from collections import defaultdict
-import struct
-import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from array import array
 import math
 import os
+import shutil
+import threading
+import numpy as np
 from TP4.EJ1.tokenicer import TextProcessor
+from TP4.EJ1.extractors import get_extractor, FIELDS, field_term
+from TP4.EJ1.docnames import DocnameStore, write_docnames
+from TP4.EJ1.postings import (
+    PostingsReader,
+    PositionsReader,
+    map_array,
+    write_positions_index,
+)
+from TP4.EJ1.termdict import TermDictionary, write_term_dictionary
+from TP4.EJ1.manifest import (
+    read_manifest,
+    generation_name,
+    publish_generation,
+    check_generation,
+    previous_generation,
+    remove_old_generations,
+)
+from TP4.EJ1.runs import (
+    merge_chunks,
+    write_chunk,
+    write_postings,
+    delta_encode,
+    EMPTY_POSTINGS,
+    POSTING_DTYPE,
+)
+
+
+# Estado de cada proceso de ingesta en paralelo: su propio extractor y
+# TextProcessor, creados una sola vez en el initializer del pool.
+_ingest_state = None
+
+
+def _init_ingest_worker(extractor_name, use_nltk, positional=False, fields=False):
+    global _ingest_state
+    _ingest_state = (
+        get_extractor(extractor_name),
+        TextProcessor(use_nltk),
+        positional,
+        fields,
+    )
+
+
+def read_document(extractor, file, fields=False):
+    # (texto, {campo: texto}) del archivo; sin campos el dict es None.
+    if not fields:
+        return extractor.extract_file(file), None
+    return extractor.extract_file_fields(file)
+
+
+def analyze_text(processor, text, positional=False, fields=None):
+    # Terminos del texto en orden de primera aparicion con sus frecuencias y,
+    # si positional, sus posiciones codificadas por diferencias (u4). Los
+    # terminos de cada campo de `fields` van despues, como "campo:termino", con
+    # las posiciones dentro del campo.
+    fields = fields or {}
+    if not positional:
+        term_freqs = processor.count(text)
+        for field, field_text in fields.items():
+            for term, freq in processor.count(field_text).items():
+                term_freqs[field_term(field, term)] = freq
+        return list(term_freqs), term_freqs.values(), None
+    term_positions = processor.positions(text)
+    for field, field_text in fields.items():
+        for term, positions in processor.positions(field_text).items():
+            term_positions[field_term(field, term)] = positions
+    positions = list(term_positions.values())
+    return list(term_positions), [len(p) for p in positions], delta_encode(positions)
+
+
+def split_field(term):
+    # (campo, termino) para los terminos de campo, (None, term) para el resto.
+    field, sep, rest = term.partition(":")
+    if sep and field in FIELDS:
+        return field, rest
+    return None, term
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _analyze_batch(files):
+    # Parsea y analiza un lote de documentos consecutivos y devuelve un run
+    # parcial con IDs de termino locales al lote: los terminos en orden de
+    # primera aparicion, y por documento sus pares (term_id local, freq) y,
+    # si el indice es posicional, las posiciones de cada par.
+    extractor, processor, positional, fields = _ingest_state
+    local_ids = {}
+    terms = []
+    term_ids = array("I")
+    freqs = array("I")
+    lengths = array("I")
+    positions = array("I")
+    for file in files:
+        text, field_texts = read_document(extractor, file, fields)
+        doc_terms, doc_freqs, doc_positions = analyze_text(
+            processor, text, positional, field_texts
+        )
+        for term in doc_terms:
+            term_id = local_ids.get(term)
+            if term_id is None:
+                term_id = len(terms)
+                local_ids[term] = term_id
+                terms.append(term)
+            term_ids.append(term_id)
+        freqs.extend(doc_freqs)
+        if positional:
+            positions.frombytes(doc_positions.tobytes())
+        lengths.append(len(doc_terms))
+    return terms, term_ids, freqs, lengths, positions
+
+
+class DocStatsAccumulator:
+    # Acumula, termino a termino mientras se escriben las postings, la norma
+    # tf-idf y la longitud (suma de frecuencias) de cada documento. Se guardan
+    # como arreglos indexados por doc_id: float32 para las normas y uint32 para
+    # las longitudes. Los terminos de campo no cuentan para la norma ni para la
+    # longitud del documento; suman a la longitud de su campo, una columna por
+    # campo de FIELDS.
+    def __init__(self, n_docs, total_docs):
+        self.total_docs = total_docs
+        self.norms = np.zeros(n_docs, dtype=np.float64)
+        self.lengths = np.zeros(n_docs, dtype=np.uint32)
+        self.field_lengths = np.zeros((n_docs, len(FIELDS)), dtype=np.uint32)
+
+    def add_term(self, doc_ids, freqs, field=None):
+        df = len(doc_ids)
+        if df == 0:
+            return
+        if field is not None:
+            self.field_lengths[doc_ids, FIELDS.index(field)] += freqs
+            return
+        idf = math.log(self.total_docs / df, 2)
+        weights = (1 + np.log2(freqs)) * idf
+        # Dentro de un termino cada doc_id aparece una sola vez.
+        self.norms[doc_ids] += weights * weights
+        self.lengths[doc_ids] += freqs
+
+    def doc_norms(self):
+        return np.sqrt(self.norms).astype(np.float32)
+
+    def save(self, norms_path, lengths_path, field_lengths_path=None):
+        self.doc_norms().tofile(norms_path)
+        self.lengths.tofile(lengths_path)
+        if field_lengths_path is not None:
+            self.field_lengths.tofile(field_lengths_path)
 
 
 class Indexer:
-    def __init__(self, saveNorms=False):
+    def __init__(
+        self,
+        saveNorms=False,
+        extractor="auto",
+        index_dir=".",
+        positional=False,
+        fields=False,
+    ):
         self.text_processor = TextProcessor()
+        self.extractor = get_extractor(extractor)
         self.terms = []
         self.term_ids = {}
-        self.json_data = defaultdict(lambda: {"postings": {}})
+        # Acumulador de postings del chunk actual: tres columnas paralelas de
+        # enteros de 32 bits (12 bytes por posting), en orden de llegada.
+        self.acc_term_ids = array("I")
+        self.acc_doc_ids = array("I")
+        self.acc_freqs = array("I")
+        # Con positional=True tambien se guardan las posiciones de cada termino
+        # (positions.bin), necesarias para las consultas por frase y NEAR/k.
+        self.positional = positional
+        self.acc_positions = array("I")
+        # Con fields=True el titulo y los encabezados (FIELDS) se indexan
+        # tambien aparte, como terminos "campo:termino" con su propia longitud.
+        self.fields = fields
+        # Los chunks se escriben agrupados por termino con varints (ver runs.py);
+        # con False, como registros (term_id, doc_id, freq) de 12 bytes.
+        self.compress_chunks = True
         self.file_index = 0
         self.n_iterations = 0
         self.epoch = 0
-        self.PATH_CHUNKS = Path("chunks") / "chunk"
-        self.PATH_VOCAB = "vocabulary.bin"
-        self.PATH_POSTINGS = "postings.bin"
-        self.PATH_DOCNAMES = "docnames.bin"
-        self.PATH_DOC_NORMS = "doc_norms.bin"
+        # Todos los archivos del indice van en index_dir (por defecto, el CWD).
+        # Los indices publicados con manifest estan en un subdirectorio por
+        # generacion; sin manifest se usan los archivos sueltos en index_dir.
+        self.index_dir = index_dir
+        self.PATH_CHUNKS = Path(index_dir) / "chunks" / "chunk"
+        self._set_index_paths(index_dir)
+        self.generation = 0
+        # Protege el cambio de generacion en refresh(): las lecturas toman las
+        # referencias al indice, las postings y los docnames juntas.
+        self._swap_lock = threading.Lock()
         self.saveNorms = saveNorms
+        self.peak_accumulator_bytes = 0
+        self.peak_accumulator_postings = 0
+        self.n_postings = 0
         self.docnames = {}
         self.index = {}
+        self.postings = None
+        self.positions = None
+        self.doc_norms = None
+        self.doc_lengths = None
+        self.field_lengths = None
         self.doc_count = 0
 
+    def _set_index_paths(self, directory):
+        self.PATH_VOCAB = os.path.join(directory, "vocabulary.bin")
+        self.PATH_VOCAB_INDEX = os.path.join(directory, "vocabulary_index.bin")
+        self.PATH_POSTINGS = os.path.join(directory, "postings.bin")
+        self.PATH_DOCNAMES = os.path.join(directory, "docnames.bin")
+        self.PATH_DOCNAMES_OFFSETS = os.path.join(directory, "docnames_offsets.bin")
+        self.PATH_DOC_NORMS = os.path.join(directory, "doc_norms.bin")
+        self.PATH_DOC_LENGTHS = os.path.join(directory, "doc_lengths.bin")
+        self.PATH_FIELD_LENGTHS = os.path.join(directory, "field_lengths.bin")
+        self.PATH_POSITIONS = os.path.join(directory, "positions.bin")
+        self.PATH_POSITIONS_INDEX = os.path.join(directory, "positions_index.bin")
+
+    def _index_files(self):
+        files = [
+            self.PATH_VOCAB,
+            self.PATH_VOCAB_INDEX,
+            self.PATH_POSTINGS,
+            self.PATH_DOCNAMES,
+            self.PATH_DOCNAMES_OFFSETS,
+            self.PATH_DOC_NORMS,
+            self.PATH_DOC_LENGTHS,
+        ]
+        if self.positional:
+            files += [self.PATH_POSITIONS, self.PATH_POSITIONS_INDEX]
+        if self.fields:
+            files.append(self.PATH_FIELD_LENGTHS)
+        return files
+
+    def _begin_generation(self):
+        # Los archivos del build van a un directorio de generacion nuevo; si
+        # quedo uno con ese numero de un build que no termino, se descarta.
+        manifest = read_manifest(self.index_dir)
+        self.generation = manifest["generation"] + 1 if manifest else 1
+        directory = os.path.join(self.index_dir, generation_name(self.generation))
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        self._set_index_paths(directory)
+
+    def _commit_generation(self):
+        publish_generation(
+            self.index_dir, self.generation, self._index_files(), self.doc_count
+        )
+        remove_old_generations(self.index_dir, self.generation)
+        print(f"[DEBUG] Publicada la generacion {self.generation} del indice.")
+
     def getAllDocsID(self):
         result = []
         for docId, docname in enumerate(self.docnames):
-            result.append((docname, docId))
+            if docname:
+                result.append((docname, docId))
         return result
 
-    def _add_document(self, doc_id, text, docname):
-
-        term_freqs = self.text_processor.process(text)
-        for term, freq in term_freqs.items():
-            if term not in self.term_ids:
-                term_id = len(self.terms)
-                self.term_ids[term] = term_id
-                self.terms.append(term)
-            else:
-                term_id = self.term_ids[term]
-            self.json_data[term_id]["postings"][doc_id] = freq
-
+    def _add_document(self, doc_id, text, docname, fields=None):
+        terms, freqs, positions = analyze_text(
+            self.text_processor, text, self.positional, fields
+        )
+        term_ids = [self._get_term_id(term) for term in terms]
+        self._add_postings(doc_id, term_ids, freqs, docname, positions)
+
+    def _get_term_id(self, term):
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.term_ids[term] = term_id
+            self.terms.append(term)
+        return term_id
+
+    def _add_postings(self, doc_id, term_ids, freqs, docname, positions=None):
+        self.acc_term_ids.extend(term_ids)
+        n = len(self.acc_term_ids) - len(self.acc_doc_ids)
+        self.acc_doc_ids.extend(array("I", [doc_id]) * n)
+        self.acc_freqs.extend(freqs)
+        if positions is not None:
+            self.acc_positions.frombytes(memoryview(positions).cast("B"))
+        self.n_postings += n
         self.docnames[doc_id] = docname
 
+    @property
+    def accumulator_bytes(self):
+        return (
+            len(self.acc_term_ids) * self.acc_term_ids.itemsize
+            + len(self.acc_doc_ids) * self.acc_doc_ids.itemsize
+            + len(self.acc_freqs) * self.acc_freqs.itemsize
+            + len(self.acc_positions) * self.acc_positions.itemsize
+        )
+
     def _serialize_chunk(self):
         chunk_file = (
             self.PATH_CHUNKS.parent / f"{self.PATH_CHUNKS.stem}{self.epoch}.bin"
@@ -56,158 +311,429 @@ class Indexer:
 
         print(f" ----- [Serializando chunk {self.epoch}]")
 
-        with open(chunk_file, "wb") as f:
-            for term_id, data in sorted(self.json_data.items()):
-                for doc_id, freq in data["postings"].items():
-                    f.write(struct.pack("III", term_id, int(doc_id), freq))
+        write_chunk(
+            chunk_file,
+            self.acc_term_ids,
+            self.acc_doc_ids,
+            self.acc_freqs,
+            self.acc_positions if self.positional else None,
+            chunk_file.with_suffix(".pos"),
+            self.compress_chunks,
+        )
 
-        self.json_data.clear()
+        if self.accumulator_bytes > self.peak_accumulator_bytes:
+            self.peak_accumulator_bytes = self.accumulator_bytes
+            self.peak_accumulator_postings = len(self.acc_doc_ids)
+        del self.acc_term_ids[:]
+        del self.acc_doc_ids[:]
+        del self.acc_freqs[:]
+        del self.acc_positions[:]
         self.epoch += 1
 
-    def index_directory(self, path: Path, docs_per_chunk=0):
+    def _read_text(self, file: Path):
+        return self.extractor.extract_file(file)
+
+    def _read_document(self, file: Path):
+        if not self.fields:
+            return self._read_text(file), None
+        return read_document(self.extractor, file, True)
+
+    def _map_batches(self, files, workers, batch_size=64):
+        # Reparte lotes de archivos entre los workers y devuelve los runs
+        # parciales en el orden de los lotes, con a lo sumo 2 lotes por worker
+        # en vuelo.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_ingest_worker,
+            initargs=(
+                self.extractor.name,
+                self.text_processor.use_nltk,
+                self.positional,
+                self.fields,
+            ),
+        ) as executor:
+            pending = deque()
+            for batch in _batched(files, batch_size):
+                pending.append((batch, executor.submit(_analyze_batch, batch)))
+                if len(pending) >= workers * 2:
+                    batch, future = pending.popleft()
+                    yield batch, future.result()
+            while pending:
+                batch, future = pending.popleft()
+                yield batch, future.result()
+
+    def _iter_documents(self, files, workers):
+        # Devuelve (archivo, term_ids, freqs, positions) en el orden de `files`;
+        # positions es None si el indice no es posicional.
+        if workers <= 1:
+            for file in files:
+                text, field_texts = self._read_document(file)
+                terms, freqs, positions = analyze_text(
+                    self.text_processor, text, self.positional, field_texts
+                )
+                term_ids = [self._get_term_id(term) for term in terms]
+                yield file, term_ids, freqs, positions
+            return
+
+        # Reconciliacion de IDs: los terminos nuevos de cada run se numeran en
+        # su orden de primera aparicion, y los runs llegan en orden de documento,
+        # asi que los term_id globales quedan iguales a los de la version secuencial.
+        for batch, (terms, term_ids, freqs, lengths, positions) in self._map_batches(
+            files, workers
+        ):
+            mapping = [self._get_term_id(term) for term in terms]
+            start = 0
+            position_start = 0
+            for file, length in zip(batch, lengths):
+                end = start + length
+                doc_positions = None
+                if self.positional:
+                    position_end = position_start + sum(freqs[start:end])
+                    doc_positions = positions[position_start:position_end]
+                    position_start = position_end
+                yield (
+                    file,
+                    [mapping[i] for i in term_ids[start:end]],
+                    freqs[start:end],
+                    doc_positions,
+                )
+                start = end
+
+    def index_directory(
+        self, path: Path, docs_per_chunk=0, workers=1, memory_budget_mb=0
+    ):
+        # Con memory_budget_mb > 0 el chunk se vuelca a disco cuando el
+        # acumulador llega al presupuesto, y docs_per_chunk se ignora.
         print(f"\nRecorriendo y tokenizando documentos.\n")
         doc_files = list(path.rglob("*.html"))
         self.doc_count = len(doc_files)
 
         if docs_per_chunk == 0:
             docs_per_chunk = int(self.doc_count * 0.1)
+        budget_bytes = memory_budget_mb * 2**20
 
         start_time = time.time()
 
-        for file in path.rglob("*"):
-            if file.is_file():
-                with open(file, encoding="utf-8") as f:
-                    html = f.read()
-                soup = BeautifulSoup(html, "html.parser")
-                for tag in soup(["script", "style"]):
-                    tag.extract()
-                text = soup.get_text()
-                self._add_document(str(self.file_index), text, file.stem)
-                self.file_index += 1
-                self.n_iterations += 1
-
-                if self.n_iterations >= docs_per_chunk:
-                    self._serialize_chunk()
-                    self.n_iterations = 0
-
-                if (self.file_index % 250) == 0:
-                    print(f" --- {self.file_index} documentos analizados.")
+        # Con workers > 1, el parseo del HTML y el analisis se hacen en otros
+        # procesos. Los doc_id se asignan aca, en el orden de `files`, por lo que
+        # son los mismos que en la version secuencial.
+        files = [file for file in path.rglob("*") if file.is_file()]
+
+        for file, term_ids, freqs, positions in self._iter_documents(files, workers):
+            self._add_postings(self.file_index, term_ids, freqs, file.stem, positions)
+            self.file_index += 1
+            self.n_iterations += 1
+
+            if budget_bytes > 0:
+                flush = self.accumulator_bytes >= budget_bytes
+            else:
+                flush = self.n_iterations >= docs_per_chunk
+            if flush:
+                self._serialize_chunk()
+                self.n_iterations = 0
+
+            if (self.file_index % 250) == 0:
+                print(f" --- {self.file_index} documentos analizados.")
 
         if self.n_iterations > 0:
             self._serialize_chunk()
 
         print(f" Tiempo de indexado: {time.time() - start_time} s.")
+        print(
+            f" Chunks escritos: {self.epoch}, pico del acumulador: "
+            f"{self.peak_accumulator_bytes / 2**20:.1f} MB "
+            f"({self.accumulator_bytes_per_posting():.1f} bytes por posting)."
+        )
+
+    def index_documents(self, documents, docs_per_chunk=250):
+        # Como index_directory, pero con documentos en memoria: pares
+        # (docname, html).
+        for docname, html in documents:
+            if self.fields:
+                text, field_texts = self.extractor.extract_fields(html)
+                self._add_document(self.file_index, text, docname, field_texts)
+            else:
+                self._add_document(
+                    self.file_index, self.extractor.extract(html), docname
+                )
+            self.file_index += 1
+            self.doc_count += 1
+            self.n_iterations += 1
+            if self.n_iterations >= docs_per_chunk:
+                self._serialize_chunk()
+                self.n_iterations = 0
+        if self.n_iterations > 0:
+            self._serialize_chunk()
+            self.n_iterations = 0
+
+    def accumulator_bytes_per_posting(self):
+        # Medido sobre el chunk mas grande que se vuelco: incluye las
+        # posiciones cuando el indice es posicional.
+        if not self.peak_accumulator_postings:
+            return 0.0
+        return self.peak_accumulator_bytes / self.peak_accumulator_postings
 
     def saveDocNorms(self):
-        doc_norms = {}
-
-        with open(self.PATH_POSTINGS, "rb") as p_file:
-            for term, (offset, df) in self.index.items():
-                if df == 0:
-                    continue
-                idf = math.log(self.doc_count / df, 2)
-                p_file.seek(offset)
-                for _ in range(df):
-                    doc_id, freq = struct.unpack("II", p_file.read(8))
-                    tfidf = (1 + math.log(freq, 2)) * idf
-                    if doc_id in doc_norms:
-                        doc_norms[doc_id] += tfidf**2
-                    else:
-                        doc_norms[doc_id] = tfidf**2
-
-        for doc_id in doc_norms:
-            doc_norms[doc_id] = math.sqrt(doc_norms[doc_id])
-
-        with open(self.PATH_DOC_NORMS, "wb") as f:
-            pickle.dump(dict(doc_norms), f)
+        # Solo para indices construidos sin doc_norms.bin: recalcula normas y
+        # longitudes recorriendo postings.bin completo.
+        stats = DocStatsAccumulator(len(self.docnames), self.doc_count)
+        postings = np.fromfile(self.PATH_POSTINGS, dtype=POSTING_DTYPE)
+        for term, (offset, df) in self.index.items():
+            start = offset // POSTING_DTYPE.itemsize
+            term_postings = postings[start : start + df]
+            stats.add_term(term_postings["doc_id"], term_postings["freq"])
+        stats.save(self.PATH_DOC_NORMS, self.PATH_DOC_LENGTHS)
+
+    def _map_doc_stats(self):
+        # Mapea las normas y longitudes de la generacion actual. Un arreglo que
+        # falta queda en None (indices anteriores sin esos archivos).
+        self.doc_norms = self.doc_lengths = self.field_lengths = None
+        if os.path.exists(self.PATH_DOC_NORMS):
+            self.doc_norms = map_array(self.PATH_DOC_NORMS, np.float32)
+        if os.path.exists(self.PATH_DOC_LENGTHS):
+            self.doc_lengths = map_array(self.PATH_DOC_LENGTHS, np.uint32)
+        if os.path.exists(self.PATH_FIELD_LENGTHS):
+            lengths = map_array(self.PATH_FIELD_LENGTHS, np.uint32)
+            self.field_lengths = lengths.reshape(-1, len(FIELDS))
 
     def getDocNorms(self):
-        with open(self.PATH_DOC_NORMS, "rb") as f:
-            doc_norms = pickle.load(f)
-            return doc_norms
+        # Arreglo float32 indexado por doc_id, mapeado en memoria (O(1) al cargar).
+        return self.doc_norms
+
+    def getDocLengths(self):
+        # Se mapea una vez por generacion: quien calcule algo a partir de las
+        # longitudes (avgdl en BM25) lo puede reusar mientras sea el mismo arreglo.
+        return self.doc_lengths
+
+    def getAvgDocLength(self):
+        lengths = self.getDocLengths()
+        return float(lengths.mean()) if len(lengths) else 0.0
+
+    def getFieldLengths(self):
+        # Arreglo uint32 (doc_id, campo) con las columnas en el orden de FIELDS,
+        # o None si el indice no tiene campos.
+        return self.field_lengths
+
+    def _chunk_files(self):
+        return [
+            self.PATH_CHUNKS.parent / f"{self.PATH_CHUNKS.stem}{epoch}.bin"
+            for epoch in range(self.epoch)
+        ]
 
     def build_vocabulary(self):
         print(f"\nConstruyendo índice a partir de los chunks.\n")
+        self._begin_generation()
 
         offset = 0
         vocab = {}
-        postings_dict = defaultdict(list)
-
-        # Aca leo todos los chunks UNA SOLA VEZ y agrupo por term_id
-        # Realmente, esto trae el indice entero a memoria, venciendo el sentido de los chunks,
-        # pero por cuestiones de tiempo de ejecucion decidi hacerlo de esta manera.
-        # (Caso contrario, hubiera recorrido cada chunk en busqueda de un term_id especifico, guardar su posting list,
-        # y pasar al siguiente termino).
 
+        # Merge externo: cada chunk se lee de a bloques y las postings de cada
+        # termino se escriben apenas estan completas, asi que en memoria solo hay
+        # un buffer por chunk y la lista del termino actual.
         start_time = time.time()
-
-        for epoch in range(self.epoch):
-            chunk_file = self.PATH_CHUNKS.parent / f"{self.PATH_CHUNKS.stem}{epoch}.bin"
-            with open(chunk_file, "rb") as c_file:
-                while True:
-                    data = c_file.read(12)
-                    if not data:
-                        break
-                    term_id, doc_id, freq = struct.unpack("III", data)
-                    postings_dict[term_id].append((doc_id, freq))
-
-        print(f" Tiempo de merge: {time.time() - start_time} s.")
+        chunk_files = self._chunk_files()
+        positions_files = None
+        if self.positional:
+            positions_files = [path.with_suffix(".pos") for path in chunk_files]
+        merged = merge_chunks(chunk_files, positions_files=positions_files)
+        next_term = next(merged, None)
+        stats = DocStatsAccumulator(self.file_index, self.doc_count)
+        posting_starts = array("Q")
+        position_starts = array("Q")
+        n_written = 0
+        n_positions = 0
 
         total_terms = len(self.terms)
         step = max(1, total_terms // 10)
 
         # Escribir postings ordenados y armar vocabulario
-        with open(self.PATH_VOCAB, "wb") as v_file, open(
-            self.PATH_POSTINGS, "wb"
-        ) as p_file:
+        with open(self.PATH_POSTINGS, "wb") as p_file, open(
+            self.PATH_POSITIONS if self.positional else os.devnull, "wb"
+        ) as pos_file:
             for term_id, term in enumerate(self.terms):
-                postings = postings_dict.get(term_id, [])
-                postings.sort()  # Ordenar por doc_id
-
-                df = len(postings)
-                for doc_id, freq in postings:
-                    p_file.write(struct.pack("II", doc_id, freq))
+                if next_term is not None and next_term[0] == term_id:
+                    doc_ids, freqs = next_term[1], next_term[2]
+                    if self.positional:
+                        positions = next_term[3]
+                    next_term = next(merged, None)
+                else:
+                    doc_ids, freqs = EMPTY_POSTINGS
+
+                df = len(doc_ids)
                 vocab[term] = (offset, df)
-                offset += df * 8
+                offset += write_postings(p_file, doc_ids, freqs)
+                stats.add_term(doc_ids, freqs, split_field(term)[0])
+
+                if self.positional and df > 0:
+                    posting_starts.append(n_written)
+                    position_starts.append(n_positions)
+                    positions.tofile(pos_file)
+                    n_positions += len(positions)
+                n_written += df
 
                 if (term_id + 1) % step == 0:
                     percent = ((term_id + 1) * 100) // total_terms
                     print(f" --- {percent}% de los términos almacenados.")
 
-            pickle.dump(vocab, v_file)
-            print(f"[DEBUG] Guardado vocabulario con {len(vocab)} términos.")
+            print(f" Tiempo de merge: {time.time() - start_time} s.")
+        write_term_dictionary(self.PATH_VOCAB, self.PATH_VOCAB_INDEX, vocab)
+        print(f"[DEBUG] Guardado vocabulario con {len(vocab)} términos.")
 
-        with open(self.PATH_DOCNAMES, "wb") as d_file:
-            pickle.dump(self.docnames, d_file)
+        stats.save(
+            self.PATH_DOC_NORMS,
+            self.PATH_DOC_LENGTHS,
+            self.PATH_FIELD_LENGTHS if self.fields else None,
+        )
+        if self.positional:
+            write_positions_index(
+                self.PATH_POSITIONS_INDEX, posting_starts, position_starts
+            )
+
+        self.save_docnames()
+        self._commit_generation()
+
+    def save_docnames(self):
+        # Los doc_id son densos (0..N-1); si faltara alguno queda con nombre vacio.
+        n_docs = max(self.docnames, default=-1) + 1
+        write_docnames(
+            self.PATH_DOCNAMES_OFFSETS,
+            self.PATH_DOCNAMES,
+            (self.docnames.get(doc_id, "") for doc_id in range(n_docs)),
+        )
 
     def load_index(self):
         print(f"\nCargando indice desde el archivo a la memora.\n")
-        if not os.path.exists(self.PATH_VOCAB):
+        manifest = read_manifest(self.index_dir)
+        if manifest is not None:
+            missing = check_generation(self.index_dir, manifest)
+            if missing is not None:
+                print(f"[ERROR]: Archivo {missing} incompleto o faltante.")
+                manifest = previous_generation(self.index_dir, manifest["generation"])
+                if manifest is None:
+                    return
+                print(
+                    f"[DEBUG] Se usa la generacion anterior {manifest['generation']}."
+                )
+            self.generation = manifest["generation"]
+            self._set_index_paths(os.path.join(self.index_dir, manifest["directory"]))
+            self.doc_count = manifest["doc_count"]
+        if not os.path.exists(self.PATH_VOCAB_INDEX):
             print("[ERROR]: Vocabulario no encontrado.")
             return
-        with open(self.PATH_VOCAB, "rb") as v_file:
-            self.index = pickle.load(v_file)
-        if not os.path.exists(self.PATH_DOCNAMES):
+        # Todos los archivos de la generacion se mapean aca, una sola vez: si un
+        # build posterior borra la generacion, este lector la sigue leyendo.
+        self.index = TermDictionary(self.PATH_VOCAB, self.PATH_VOCAB_INDEX)
+        self.postings = PostingsReader(self.PATH_POSTINGS)
+        self.postings.open()
+        self.positions = None
+        if os.path.exists(self.PATH_POSITIONS_INDEX):
+            self.positions = PositionsReader(
+                self.PATH_POSITIONS, self.PATH_POSITIONS_INDEX
+            )
+        if not os.path.exists(self.PATH_DOCNAMES_OFFSETS):
             print("[ERROR]: DOCNAMES no encontrados.")
             return
-        with open(self.PATH_DOCNAMES, "rb") as d_file:
-            self.docnames = pickle.load(d_file)
-        if self.saveNorms:
+        self.docnames = DocnameStore(self.PATH_DOCNAMES_OFFSETS, self.PATH_DOCNAMES)
+        if self.doc_count == 0:
+            self.doc_count = self.docnames.named_count()
+        # Las normas se calculan al construir el indice; solo se recalculan si
+        # el indice es anterior y no tiene el archivo.
+        if self.saveNorms and not os.path.exists(self.PATH_DOC_NORMS):
             self.saveDocNorms()
+        self._map_doc_stats()
+
+    def refresh(self):
+        # Cambia a la ultima generacion publicada sin reiniciar. La generacion
+        # nueva se abre aparte y se reemplaza de una vez; las consultas que ya
+        # tenian la anterior la siguen leyendo. Devuelve True si hubo cambio.
+        manifest = read_manifest(self.index_dir)
+        if manifest is None or manifest["generation"] == self.generation:
+            return False
+        snapshot = type(self)(self.saveNorms, self.extractor, self.index_dir)
+        snapshot.load_index()
+        if snapshot.generation != manifest["generation"]:
+            return False
+        with self._swap_lock:
+            for name in (
+                "index",
+                "postings",
+                "positions",
+                "doc_norms",
+                "doc_lengths",
+                "field_lengths",
+                "docnames",
+                "doc_count",
+                "generation",
+            ):
+                setattr(self, name, getattr(snapshot, name))
+            self._set_index_paths(os.path.dirname(snapshot.PATH_VOCAB))
+        return True
+
+    def _readers(self):
+        with self._swap_lock:
+            return self.index, self.postings, self.docnames
+
+    def get_postings(self, term):
+        # (doc_ids, freqs) del termino como vistas sobre postings.bin.
+        index, postings, _ = self._readers()
+        return self._read_postings(index, postings, term)
+
+    def _read_postings(self, index, postings, term):
+        entry = index.get(term)
+        if entry is None:
+            return EMPTY_POSTINGS
+        offset, df = entry
+        return postings.read(offset, df)
+
+    def get_positions(self, term, doc_ids):
+        # Posiciones del termino en cada uno de `doc_ids` (que tienen que estar
+        # en sus postings), o None si el indice no guarda posiciones.
+        with self._swap_lock:
+            index, postings, positions = self.index, self.postings, self.positions
+        if positions is None:
+            return None
+        entry = index.get(term)
+        if entry is None:
+            return [np.empty(0, dtype=np.int64) for _ in doc_ids]
+        offset, df = entry
+        term_doc_ids, freqs = postings.read(offset, df)
+        which = np.searchsorted(term_doc_ids, doc_ids)
+        return positions.read(offset, freqs, which)
 
     def search(self, term):
-        if term not in self.index:
-            return []
-        offset, df = self.index[term]
-        postings = []
-        with open(self.PATH_POSTINGS, "rb") as p_file, open(
-            self.PATH_DOCNAMES, "rb"
-        ) as d_file:
-            p_file.seek(offset)
-            for _ in range(df):
-                doc_id, freq = struct.unpack("II", p_file.read(8))
-                postings.append((self.docnames[str(doc_id)], doc_id, freq))
-        return postings
+        index, postings, docnames = self._readers()
+        doc_ids, freqs = self._read_postings(index, postings, term)
+        return [
+            (docnames[doc_id], doc_id, freq)
+            for doc_id, freq in zip(doc_ids.tolist(), freqs.tolist())
+        ]
+
+    def search_weighted(self, term, field_weights):
+        # Como search(), pero la frecuencia de cada documento es
+        # tf + sum((peso - 1) * tf en el campo): una aparicion en el titulo
+        # cuenta `peso` veces y una en el resto del texto, una. Con todos los
+        # pesos en 1 es igual a search().
+        index, postings, docnames = self._readers()
+        doc_ids, freqs = self._read_postings(index, postings, term)
+        weighted = freqs.astype(np.float64)
+        for field, weight in field_weights.items():
+            field_ids, field_freqs = self._read_postings(
+                index, postings, field_term(field, term)
+            )
+            if len(field_ids) == 0 or weight == 1:
+                continue
+            # El texto de un campo casi siempre esta dentro del texto completo,
+            # pero el extractor puede pegar palabras de tags vecinos, asi que
+            # se hace la union de las dos listas.
+            merged_ids = np.union1d(doc_ids, field_ids)
+            merged = np.zeros(len(merged_ids), dtype=np.float64)
+            merged[np.searchsorted(merged_ids, doc_ids)] = weighted
+            merged[np.searchsorted(merged_ids, field_ids)] += (weight - 1) * field_freqs
+            doc_ids, weighted = merged_ids, merged
+        return [
+            (docnames[doc_id], doc_id, freq)
+            for doc_id, freq in zip(doc_ids.tolist(), weighted.tolist())
+        ]
 
     def printTermPostingList(self, term):
         print("\n")
@@ -230,10 +756,34 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("path", type=str, help="Directorio de documentos HTML")
     parser.add_argument("docs", type=int, help="Documentos por chunk (serialización)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Procesos para el parseo y analisis de documentos",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        default=0,
+        help="MB de postings en memoria antes de volcar un chunk (reemplaza a docs)",
+    )
+    parser.add_argument(
+        "--positional",
+        action="store_true",
+        help="Guardar tambien las posiciones (consultas por frase y NEAR/k)",
+    )
+    parser.add_argument(
+        "--fields",
+        action="store_true",
+        help="Indexar tambien el titulo y los encabezados como campos",
+    )
     args = parser.parse_args()
 
-    indexer = Indexer()
-    indexer.index_directory(Path(args.path), args.docs)
+    indexer = Indexer(positional=args.positional, fields=args.fields)
+    indexer.index_directory(
+        Path(args.path), args.docs, args.workers, args.memory_budget
+    )
     indexer.build_vocabulary()
     indexer.load_index()
 
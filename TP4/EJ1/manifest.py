@@ -0,0 +1,129 @@
+import json
+import os
+import shutil
+
+
+# Cada build del Indexer escribe sus archivos en un directorio de generacion
+# nuevo (gen_000001, gen_000002, ...) y recien al terminar publica el
+# manifest, reemplazandolo con un rename atomico. Un lector que abre el indice
+# ve el manifest viejo o el nuevo completo, nunca archivos a medio escribir.
+# Para que eso valga tambien despues de un corte de luz, los archivos y el
+# directorio de la generacion se sincronizan a disco antes del rename.
+#
+# Cada generacion guarda ademas una copia de su manifest en su directorio: si
+# la publicada quedo incompleta, el lector puede volver a la anterior.
+
+MANIFEST_FILE = "manifest.json"
+# Version 2: el diccionario de terminos guarda los largos en u4.
+FORMAT_VERSION = 2
+
+
+def fsync_file(path):
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+def fsync_dir(path):
+    # Sincroniza las entradas del directorio (archivos creados o renombrados).
+    # En Windows no se puede abrir un directorio, y no hace falta.
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_json_atomic(path, data):
+    # Escribe en un temporal del mismo directorio y lo renombra encima del
+    # destino; os.replace es atomico tambien si el destino ya existe.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(os.path.dirname(path) or ".")
+
+
+def read_manifest(index_dir):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Version de formato de indice no soportada: "
+            f"{manifest.get('format_version')}"
+        )
+    return manifest
+
+
+def generation_name(generation):
+    return f"gen_{generation:06d}"
+
+
+def publish_generation(index_dir, generation, paths, doc_count):
+    # paths: archivos de la generacion. El manifest guarda sus nombres y
+    # tamaños para que el lector pueda verificar que esten completos.
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "generation": generation,
+        "directory": generation_name(generation),
+        "doc_count": doc_count,
+        "files": {os.path.basename(path): os.path.getsize(path) for path in paths},
+    }
+    directory = os.path.join(index_dir, generation_name(generation))
+    for path in paths:
+        fsync_file(path)
+    write_json_atomic(os.path.join(directory, MANIFEST_FILE), manifest)
+    write_json_atomic(os.path.join(index_dir, MANIFEST_FILE), manifest)
+    return manifest
+
+
+def check_generation(index_dir, manifest):
+    # Devuelve el primer archivo que falta o no tiene el tamaño esperado.
+    directory = os.path.join(index_dir, manifest["directory"])
+    for name, size in manifest["files"].items():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            return name
+    return None
+
+
+def previous_generation(index_dir, generation):
+    # Manifest de la generacion completa mas nueva anterior a `generation`, o
+    # None si no queda ninguna.
+    numbers = []
+    for entry in os.listdir(index_dir):
+        if entry.startswith("gen_") and entry[4:].isdigit():
+            numbers.append(int(entry[4:]))
+    for number in sorted(numbers, reverse=True):
+        if number >= generation:
+            continue
+        try:
+            manifest = read_manifest(os.path.join(index_dir, generation_name(number)))
+        except (OSError, ValueError):
+            continue
+        if manifest is not None and check_generation(index_dir, manifest) is None:
+            return manifest
+    return None
+
+
+def remove_old_generations(index_dir, generation, keep=2):
+    # Borra las generaciones fuera de las ultimas `keep`. Los lectores que
+    # siguen en una generacion borrada no se enteran: load_index mapea todos
+    # sus archivos al abrirla. La anterior a la publicada se conserva para
+    # volver a ella si la publicada esta incompleta.
+    for entry in os.listdir(index_dir):
+        if not entry.startswith("gen_"):
+            continue
+        try:
+            number = int(entry[4:])
+        except ValueError:
+            continue
+        if number <= generation - keep or number > generation:
+            shutil.rmtree(os.path.join(index_dir, entry), ignore_errors=True)
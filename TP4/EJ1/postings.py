@@ -0,0 +1,84 @@
+import os
+import threading
+import numpy as np
+from TP4.EJ1.runs import POSTING_DTYPE
+
+
+class PostingsReader:
+    # Mapea postings.bin una sola vez y devuelve vistas sobre el mapeo, sin
+    # copiar ni abrir el archivo en cada busqueda. Las vistas son de solo
+    # lectura, asi que varios hilos pueden consultar el mismo lector; el lock
+    # solo protege la apertura del archivo, que es perezosa salvo que se llame
+    # a open() (load_index lo hace para no depender de que el archivo siga
+    # existiendo).
+    def __init__(self, path, dtype=POSTING_DTYPE):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self._records = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        with self._lock:
+            if self._records is None:
+                if os.path.getsize(self.path) == 0:
+                    self._records = np.empty(0, dtype=self.dtype)
+                else:
+                    self._records = np.memmap(self.path, dtype=self.dtype, mode="r")
+        return self._records
+
+    def records(self, offset, df):
+        # offset es en bytes, como se guarda en el vocabulario.
+        records = self._records
+        if records is None:
+            records = self.open()
+        start = offset // self.dtype.itemsize
+        return records[start : start + df]
+
+    def read(self, offset, df):
+        records = self.records(offset, df)
+        return records["doc_id"], records["freq"]
+
+    def close(self):
+        with self._lock:
+            self._records = None
+
+
+# Indice de positions.bin: por cada termino con postings, en el orden de
+# postings.bin, el numero de su primera posting y el de su primera posicion.
+POSITIONS_INDEX_DTYPE = np.dtype([("posting", "u8"), ("position", "u8")])
+
+
+def write_positions_index(path, posting_starts, position_starts):
+    index = np.empty(len(posting_starts), dtype=POSITIONS_INDEX_DTYPE)
+    index["posting"] = posting_starts
+    index["position"] = position_starts
+    index.tofile(path)
+
+
+def map_array(path, dtype):
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+class PositionsReader:
+    # Las posiciones de una posting estan en positions.bin a continuacion de
+    # las de la posting anterior, asi que con las freqs del termino alcanza
+    # para ubicarlas: no hace falta un offset por posting.
+    def __init__(self, path, index_path):
+        self.positions = map_array(path, np.dtype("u4"))
+        self.index = map_array(index_path, POSITIONS_INDEX_DTYPE)
+
+    def read(self, offset, freqs, which):
+        # Posiciones absolutas de las postings `which` (indices dentro de la
+        # lista del termino que empieza en `offset` de postings.bin).
+        posting = offset // POSTING_DTYPE.itemsize
+        entry = int(np.searchsorted(self.index["posting"], posting))
+        base = int(self.index["position"][entry])
+        ends = np.cumsum(freqs, dtype=np.int64)
+        result = []
+        for i in which:
+            end = base + int(ends[i])
+            start = end - int(freqs[i])
+            result.append(np.cumsum(self.positions[start:end], dtype=np.int64))
+        return result
@@ -0,0 +1,348 @@
+import heapq
+import numpy as np
+
+
+# Formato de los chunks (runs intermedios): registros (term_id, doc_id, freq)
+# de 3 enteros sin signo de 32 bits, igual que struct "III", ordenados por
+# term_id y, dentro de cada termino, por doc_id.
+CHUNK_DTYPE = np.dtype([("term_id", "u4"), ("doc_id", "u4"), ("freq", "u4")])
+
+# Formato comprimido (el que se escribe por defecto): RUN_MAGIC y despues,
+# por cada termino, una secuencia de varints
+#   term_id - term_id anterior, n, n gaps de doc_id, n freqs
+# donde el primer gap es el doc_id y los demas la diferencia con el anterior.
+# Un chunk sin comprimido no puede empezar con RUN_MAGIC: seria un term_id
+# mayor a 1.300 millones.
+RUN_MAGIC = b"\xffRUN"
+
+# Formato de postings.bin: registros (doc_id, freq), igual que struct "II".
+POSTING_DTYPE = np.dtype([("doc_id", "u4"), ("freq", "u4")])
+
+EMPTY_POSTINGS = (np.empty(0, dtype="u4"), np.empty(0, dtype="u4"))
+
+# Posiciones (opcionales): por cada posting, sus `freq` posiciones como
+# enteros u4 codificados por diferencias (la primera absoluta y despues la
+# distancia a la anterior), en el mismo orden que las postings.
+
+
+def gather_ranges(values, starts, lengths):
+    # Concatena values[starts[i] : starts[i] + lengths[i]] para cada i, sin
+    # recorrer los rangos en Python.
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    total = int(lengths.sum())
+    if total == 0:
+        return values[:0]
+    ends = np.cumsum(lengths)
+    index = np.arange(total) + np.repeat(starts - (ends - lengths), lengths)
+    return values[index]
+
+
+def delta_encode(position_lists):
+    # Una lista de posiciones crecientes por posting -> arreglo u4 con las
+    # diferencias, reiniciando en cada posting.
+    lengths = np.fromiter(map(len, position_lists), dtype=np.int64)
+    if lengths.sum() == 0:
+        return np.empty(0, dtype="u4")
+    flat = np.concatenate([np.asarray(p, dtype=np.int64) for p in position_lists])
+    deltas = np.diff(flat, prepend=0)
+    starts = (np.cumsum(lengths) - lengths)[lengths > 0]
+    deltas[starts] = flat[starts]
+    return deltas.astype("u4")
+
+
+def varint_encode(values):
+    # Codifica enteros no negativos (< 2**35) como varints de 7 bits por byte,
+    # con el bit alto en 1 en todos los bytes salvo el ultimo de cada valor.
+    values = np.asarray(values, dtype=np.uint64)
+    n_bytes = np.ones(len(values), dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        n_bytes += values >= (1 << shift)
+    offsets = np.cumsum(n_bytes) - n_bytes
+    out = np.empty(int(n_bytes.sum()), dtype=np.uint8)
+    for k in range(int(n_bytes.max(initial=0))):
+        has = n_bytes > k
+        byte = (values[has] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (n_bytes[has] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[offsets[has] + k] = byte | more
+    return out
+
+
+def varint_decode(data):
+    # Decodifica los varints completos de `data` (uint8). Devuelve los valores
+    # y cuantos bytes se usaron; los del final, si quedo un varint cortado, hay
+    # que anteponerlos al bloque siguiente.
+    ends = np.flatnonzero(data < 0x80)
+    if len(ends) == 0:
+        return np.empty(0, dtype=np.int64), 0
+    used = int(ends[-1]) + 1
+    starts = np.empty(len(ends), dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts + 1
+    payload = data & 0x7F
+    values = payload[starts].astype(np.int64)
+    # La mayoria de los valores entra en un byte; solo se vuelve sobre los
+    # que tienen mas, un byte por pasada.
+    longer = np.flatnonzero(lengths > 1)
+    shift = 7
+    while len(longer):
+        values[longer] |= payload[starts[longer] + shift // 7].astype(np.int64) << shift
+        longer = longer[lengths[longer] > shift // 7 + 1]
+        shift += 7
+    return values, used
+
+
+def encode_run(records):
+    # Registros CHUNK_DTYPE ordenados -> bytes del formato comprimido.
+    terms = records["term_id"].astype(np.int64)
+    docs = records["doc_id"].astype(np.int64)
+    n = len(records)
+    if n == 0:
+        return RUN_MAGIC
+    term_starts = np.flatnonzero(np.diff(terms, prepend=-1))
+    counts = np.diff(np.append(term_starts, n))
+    gaps = np.diff(docs, prepend=0)
+    gaps[term_starts] = docs[term_starts]
+
+    # Posicion de cada valor en la secuencia: el termino t (que empieza en el
+    # registro s) ocupa 2 + 2 * n valores a partir de 2 * t + 2 * s.
+    term_of_record = np.repeat(np.arange(len(term_starts)), counts)
+    first = 2 * term_starts + 2 * np.arange(len(term_starts))
+    gap_positions = (
+        first[term_of_record] + 2 + np.arange(n) - term_starts[term_of_record]
+    )
+    stream = np.empty(2 * len(term_starts) + 2 * n, dtype=np.int64)
+    stream[first] = np.diff(terms[term_starts], prepend=0)
+    stream[first + 1] = counts
+    stream[gap_positions] = gaps
+    stream[gap_positions + counts[term_of_record]] = records["freq"]
+    return RUN_MAGIC + varint_encode(stream).tobytes()
+
+
+def write_chunk(
+    path,
+    term_ids,
+    doc_ids,
+    freqs,
+    positions=None,
+    positions_path=None,
+    compress=True,
+):
+    # Ordena por (term_id, doc_id) de forma vectorizada, salvo que las columnas
+    # ya vengan ordenadas, y escribe todo el chunk de una vez, comprimido salvo
+    # con compress=False. Si hay posiciones, se reordenan igual que los
+    # registros y van sin comprimir a positions_path.
+    records = np.empty(len(term_ids), dtype=CHUNK_DTYPE)
+    records["term_id"] = term_ids
+    records["doc_id"] = doc_ids
+    records["freq"] = freqs
+    terms = records["term_id"]
+    docs = records["doc_id"]
+    is_sorted = np.all(
+        (terms[1:] > terms[:-1]) | ((terms[1:] == terms[:-1]) & (docs[1:] > docs[:-1]))
+    )
+    if not is_sorted:
+        if np.all(docs[1:] >= docs[:-1]):
+            # Postings acumuladas en orden de documento: alcanza con un sort
+            # estable por term_id para que cada termino quede ordenado por doc_id.
+            order = np.argsort(terms, kind="stable")
+        else:
+            order = np.lexsort((docs, terms))
+        records = records[order]
+        if positions is not None:
+            lengths = np.asarray(freqs, dtype=np.int64)
+            starts = np.cumsum(lengths) - lengths
+            positions = gather_ranges(
+                np.asarray(positions, dtype="u4"), starts[order], lengths[order]
+            )
+    if compress:
+        with open(path, "wb") as f:
+            f.write(encode_run(records))
+    else:
+        records.tofile(path)
+    if positions is not None:
+        np.asarray(positions, dtype="u4").tofile(positions_path)
+
+
+def write_postings(file, doc_ids, freqs):
+    records = np.empty(len(doc_ids), dtype=POSTING_DTYPE)
+    records["doc_id"] = doc_ids
+    records["freq"] = freqs
+    records.tofile(file)
+    return records.nbytes
+
+
+def _term_size(parts):
+    # Valores que ocupa el primer termino de `parts` (arreglos que, uno detras
+    # del otro, empiezan con su encabezado): 2 + 2n, con n el segundo valor.
+    seen = 0
+    for part in parts:
+        if seen + len(part) > 1:
+            return 2 + 2 * int(part[1 - seen])
+        seen += len(part)
+
+
+class ChunkCursor:
+    # Lee un chunk de a bloques de `buffer_size` bytes y lo recorre agrupado
+    # por termino, sin cargar el archivo entero en memoria. Los limites entre
+    # terminos de cada bloque se calculan una sola vez, vectorizados.
+    def __init__(self, path, buffer_size=1 << 20, positions_path=None):
+        self.file = open(path, "rb")
+        # Las posiciones se leen en el mismo orden que los registros.
+        self.positions_file = open(positions_path, "rb") if positions_path else None
+        self.buffer_size = buffer_size
+        self.block_records = max(1, buffer_size // CHUNK_DTYPE.itemsize)
+        self.compressed = self.file.read(len(RUN_MAGIC)) == RUN_MAGIC
+        if not self.compressed:
+            self.file.seek(0)
+        # Formato comprimido: bytes de un varint cortado al final del bloque y
+        # valores de un termino que todavia no se termino de leer.
+        self.carry = b""
+        self.pending = np.empty(0, dtype=np.int64)
+        self.last_term_id = 0
+        self.term_id = None
+        self._fill()
+
+    def _fill(self):
+        if self.compressed:
+            self._fill_compressed()
+            return
+        block = np.fromfile(self.file, dtype=CHUNK_DTYPE, count=self.block_records)
+        if len(block) == 0:
+            self.term_id = None
+            self.file.close()
+            return
+        terms = block["term_id"]
+        self.doc_ids = np.ascontiguousarray(block["doc_id"])
+        self.freqs = np.ascontiguousarray(block["freq"])
+        self.starts = np.flatnonzero(terms[1:] != terms[:-1]).tolist()
+        self.starts = [0] + [start + 1 for start in self.starts] + [len(block)]
+        self.block_terms = terms[self.starts[:-1]].tolist()
+        self.run = 0
+        self.term_id = self.block_terms[0]
+
+    def _fill_compressed(self):
+        # Decodifica bloques hasta tener al menos un termino completo; los
+        # terminos completos del bloque quedan como si fueran un bloque del
+        # formato sin comprimir, y lo que sobra se guarda para el proximo.
+        # Un termino puede ocupar muchos bloques: las partes se juntan en una
+        # lista y se concatenan una sola vez, cuando el termino esta completo.
+        parts = [self.pending]
+        available = len(self.pending)
+        needed = _term_size(parts) if available >= 2 else 2
+        while available < needed:
+            data = self.file.read(self.buffer_size)
+            if not data:
+                self.file.close()
+                if available or self.carry:
+                    raise ValueError(f"Chunk truncado: {self.file.name}")
+                self.term_id = None
+                return
+            data = self.carry + data
+            values, used = varint_decode(np.frombuffer(data, dtype=np.uint8))
+            self.carry = data[used:]
+            parts.append(values)
+            available += len(values)
+            if available >= 2:
+                needed = _term_size(parts)
+        values = np.concatenate(parts)
+
+        # Solo los encabezados se recorren en Python: en la posicion p hay
+        # (delta de term_id, n) y el termino ocupa hasta p + 2 + 2n.
+        heads = []
+        position = 0
+        while position + 2 <= len(values):
+            count = values.item(position + 1)
+            end = position + 2 + 2 * count
+            if end > len(values):
+                break
+            heads.append(position)
+            position = end
+        self.pending = values[position:]
+
+        heads = np.array(heads, dtype=np.int64)
+        counts = values[heads + 1]
+        gaps = gather_ranges(values, heads + 2, counts)
+        self.freqs = gather_ranges(values, heads + 2 + counts, counts).astype("u4")
+        # Suma acumulada de los gaps, reiniciada al comienzo de cada termino.
+        doc_ids = np.cumsum(gaps)
+        ends = np.cumsum(counts)
+        before = np.concatenate(([0], doc_ids[ends[:-1] - 1]))
+        self.doc_ids = (doc_ids - np.repeat(before, counts)).astype("u4")
+        self.starts = [0] + ends.tolist()
+        term_ids = self.last_term_id + np.cumsum(values[heads])
+        self.last_term_id = int(term_ids[-1])
+        self.block_terms = term_ids.tolist()
+        self.run = 0
+        self.term_id = self.block_terms[0]
+
+    def take_term(self):
+        # Devuelve [(doc_ids, freqs), ...] del termino actual (mas de una parte si
+        # el termino continua en el bloque siguiente) y avanza al proximo termino.
+        # Con posiciones, cada parte es (doc_ids, freqs, positions).
+        term_id = self.term_id
+        parts = []
+        while self.term_id == term_id:
+            start, end = self.starts[self.run], self.starts[self.run + 1]
+            part = (self.doc_ids[start:end], self.freqs[start:end])
+            if self.positions_file is not None:
+                count = int(part[1].sum())
+                part += (np.fromfile(self.positions_file, dtype="u4", count=count),)
+            parts.append(part)
+            self.run += 1
+            if self.run == len(self.block_terms):
+                self._fill()
+            else:
+                self.term_id = self.block_terms[self.run]
+        return parts
+
+    def close(self):
+        self.file.close()
+        if self.positions_file is not None:
+            self.positions_file.close()
+
+
+def merge_chunks(chunk_files, buffer_size=1 << 20, positions_files=None):
+    # Merge de k vias con un heap sobre el term_id actual de cada chunk. Genera
+    # (term_id, doc_ids, freqs) en orden de term_id, con cada lista completa
+    # apenas se terminaron de leer las partes de ese termino en todos los chunks.
+    # Con positions_files genera (term_id, doc_ids, freqs, positions).
+    if positions_files is None:
+        positions_files = [None] * len(chunk_files)
+    cursors = [
+        ChunkCursor(path, buffer_size, positions_path)
+        for path, positions_path in zip(chunk_files, positions_files)
+    ]
+    heap = [(c.term_id, i) for i, c in enumerate(cursors) if c.term_id is not None]
+    heapq.heapify(heap)
+    try:
+        while heap:
+            term_id = heap[0][0]
+            parts = []
+            while heap and heap[0][0] == term_id:
+                _, i = heapq.heappop(heap)
+                parts.extend(cursors[i].take_term())
+                if cursors[i].term_id is not None:
+                    heapq.heappush(heap, (cursors[i].term_id, i))
+
+            if len(parts) == 1:
+                yield (term_id, *parts[0])
+                continue
+            columns = [np.concatenate(column) for column in zip(*parts)]
+            doc_ids, freqs = columns[0], columns[1]
+            # Cada parte ya viene ordenada por doc_id; solo hace falta ordenar
+            # si las partes se solapan (chunks que no siguen el orden de docs).
+            if any(prev[0][-1] >= nxt[0][0] for prev, nxt in zip(parts, parts[1:])):
+                order = np.argsort(doc_ids, kind="stable")
+                if len(columns) == 3:
+                    lengths = freqs.astype(np.int64)
+                    starts = np.cumsum(lengths) - lengths
+                    columns[2] = gather_ranges(
+                        columns[2], starts[order], lengths[order]
+                    )
+                columns[0], columns[1] = doc_ids[order], freqs[order]
+            yield (term_id, *columns)
+    finally:
+        for cursor in cursors:
+            cursor.close()
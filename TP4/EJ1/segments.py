@@ -0,0 +1,705 @@
+import copy
+import heapq
+import json
+import math
+import os
+import shutil
+import threading
+import weakref
+from pathlib import Path
+import numpy as np
+from TP4.EJ1.indexer import Indexer, DocStatsAccumulator
+from TP4.EJ1.docnames import write_docnames
+from TP4.EJ1.termdict import write_term_dictionary
+from TP4.EJ1.runs import write_postings, EMPTY_POSTINGS
+from TP4.EJ1.manifest import write_json_atomic
+
+
+# Indice incremental por segmentos. Cada lote de documentos se indexa en un
+# segmento nuevo (un indice completo del Indexer en su propio directorio) que
+# despues no se modifica. Las consultas recorren todos los segmentos vivos y
+# una politica de merge logaritmica junta segmentos chicos en uno mas grande
+# en un hilo aparte.
+#
+# Los doc_id globales son doc_base + doc_id local. Cada segmento nuevo recibe
+# como doc_base el siguiente doc_id libre, asi que segmentos vecinos cubren
+# rangos contiguos y un merge de vecinos solo concatena sus documentos: los
+# doc_id globales no cambian al mergear.
+#
+# Los documentos borrados se marcan en un bitset por segmento (deleted.bin)
+# y se filtran al consultar; recien compact() los elimina de las postings y
+# renumera los doc_id.
+
+SEGMENTS_FILE = "segments.json"
+
+
+class Segment:
+    def __init__(self, name, directory, doc_base):
+        self.name = name
+        self.directory = directory
+        self.doc_base = doc_base
+        self.indexer = Indexer(index_dir=directory)
+        self.indexer.load_index()
+        # Cantidad de doc_ids que ocupa el segmento (incluye los sin nombre).
+        self.n_docs = len(self.indexer.docnames)
+        self.PATH_DELETED = os.path.join(directory, "deleted.bin")
+        self.deleted = None
+        self.n_deleted = 0
+        self._doc_ids_by_name = None
+        if os.path.exists(self.PATH_DELETED):
+            bits = np.fromfile(self.PATH_DELETED, dtype=np.uint8)
+            self.deleted = np.unpackbits(
+                bits, count=self.n_docs, bitorder="little"
+            ).astype(bool)
+            self.n_deleted = int(np.count_nonzero(self.deleted))
+
+    @property
+    def doc_count(self):
+        return self.indexer.doc_count - self.n_deleted
+
+    def is_deleted(self, doc_id):
+        return self.n_deleted > 0 and bool(self.deleted[doc_id])
+
+    def find(self, docname):
+        # doc_ids locales vivos con ese nombre. Los nombres de un segmento no
+        # cambian, asi que el diccionario nombre -> doc_ids se arma una sola vez,
+        # en la primera busqueda.
+        if self._doc_ids_by_name is None:
+            by_name = {}
+            for doc_id, name in enumerate(self.indexer.docnames):
+                by_name.setdefault(name, []).append(doc_id)
+            self._doc_ids_by_name = by_name
+        return [
+            doc_id
+            for doc_id in self._doc_ids_by_name.get(docname, ())
+            if not self.is_deleted(doc_id)
+        ]
+
+    def delete(self, doc_ids):
+        # Marca doc_ids locales como borrados y reescribe el bitset (via un
+        # archivo temporal, para no dejar nunca uno a medio escribir).
+        if self.deleted is None:
+            self.deleted = np.zeros(self.n_docs, dtype=bool)
+        self.deleted[doc_ids] = True
+        self.n_deleted = int(np.count_nonzero(self.deleted))
+        tmp_path = self.PATH_DELETED + ".tmp"
+        np.packbits(self.deleted, bitorder="little").tofile(tmp_path)
+        os.replace(tmp_path, self.PATH_DELETED)
+
+    def live_postings(self, doc_ids, freqs):
+        # Sin borrados no hay nada que filtrar, y las vistas no se copian.
+        if self.n_deleted:
+            keep = ~self.deleted[doc_ids]
+            return doc_ids[keep], freqs[keep]
+        return doc_ids, freqs
+
+    def get_postings(self, term):
+        # Postings vivas del termino con doc_ids globales.
+        doc_ids, freqs = self.live_postings(*self.indexer.get_postings(term))
+        return doc_ids + np.uint32(self.doc_base), freqs
+
+
+def _retire_segments(segments):
+    # Una consulta en curso puede tener todavia la lista de segmentos vieja y
+    # abrir sus archivos (postings, normas, longitudes) recien al leerlos. Por
+    # eso el directorio de un segmento reemplazado se borra cuando se libera
+    # su indexer, es decir, cuando ya no lo referencia ninguna lista. Las
+    # copias de un segmento (compact) comparten el indexer.
+    for segment in segments:
+        weakref.finalize(segment.indexer, shutil.rmtree, segment.directory, True)
+
+
+def _iter_segment_terms(index, position):
+    for term, value in index.items():
+        yield term, position, value
+
+
+def iter_term_groups(segments):
+    # Recorre en orden la union de los vocabularios de los segmentos y devuelve
+    # para cada termino (term, [(segmento, offset, df), ...]), con las partes en
+    # el orden de los segmentos, es decir, en orden de doc_id.
+    merged = heapq.merge(
+        *(
+            _iter_segment_terms(segment.indexer.index, position)
+            for position, segment in enumerate(segments)
+        )
+    )
+    group_term = None
+    parts = []
+    for term, position, (offset, df) in merged:
+        if term != group_term:
+            if parts:
+                yield group_term, parts
+            group_term = term
+            parts = []
+        parts.append((segments[position], offset, df))
+    if parts:
+        yield group_term, parts
+
+
+def global_term_ids(segments):
+    # Numera los terminos de la union ordenada de los vocabularios y devuelve
+    # (numero de terminos, [numero de termino de cada posting del segmento, en
+    # el orden de postings.bin]). Con eso las estadisticas globales (df, N) se
+    # recalculan con operaciones sobre arreglos, sin volver a recorrer los
+    # vocabularios.
+    numbers = [[] for _ in segments]
+    offsets = [[] for _ in segments]
+    dfs = [[] for _ in segments]
+    positions = {id(segment): position for position, segment in enumerate(segments)}
+    n_terms = 0
+    for _, parts in iter_term_groups(segments):
+        for segment, offset, df in parts:
+            position = positions[id(segment)]
+            numbers[position].append(n_terms)
+            offsets[position].append(offset)
+            dfs[position].append(df)
+        n_terms += 1
+    term_ids = []
+    for segment_numbers, segment_offsets, segment_dfs in zip(numbers, offsets, dfs):
+        # El vocabulario esta en orden alfabetico y postings.bin en el orden
+        # en que se escribieron los terminos.
+        order = np.argsort(np.array(segment_offsets, dtype=np.int64), kind="stable")
+        term_ids.append(
+            np.repeat(
+                np.array(segment_numbers, dtype=np.uint32)[order],
+                np.array(segment_dfs, dtype=np.int64)[order],
+            )
+        )
+    return n_terms, term_ids
+
+
+def live_doc_norms(segments, n_terms, term_ids, n_docs, total_docs):
+    # Normas tf-idf de los documentos vivos con el N y los df de los documentos
+    # vivos; mismo resultado que DocStatsAccumulator sobre las postings vivas.
+    df = np.zeros(n_terms, dtype=np.int64)
+    parts = []
+    for segment, segment_term_ids in zip(segments, term_ids):
+        records = segment.indexer.postings.records(0, len(segment_term_ids))
+        doc_ids, freqs = records["doc_id"], records["freq"]
+        if segment.n_deleted:
+            live = ~segment.deleted[doc_ids]
+            segment_term_ids = segment_term_ids[live]
+            doc_ids, freqs = doc_ids[live], freqs[live]
+        df += np.bincount(segment_term_ids, minlength=n_terms)
+        parts.append((segment_term_ids, doc_ids + np.int64(segment.doc_base), freqs))
+    idf = np.zeros(n_terms, dtype=np.float64)
+    present = df > 0
+    idf[present] = np.log2(total_docs / df[present])
+    norms = np.zeros(n_docs, dtype=np.float64)
+    for segment_term_ids, doc_ids, freqs in parts:
+        weights = (1 + np.log2(freqs)) * idf[segment_term_ids]
+        norms += np.bincount(doc_ids, weights=weights * weights, minlength=n_docs)
+    return np.sqrt(norms).astype(np.float32)
+
+
+def _gather_postings(parts, doc_base=0):
+    # Concatena las postings de un termino en varios segmentos, con doc_ids
+    # relativos a doc_base.
+    doc_ids = []
+    freqs = []
+    for segment, offset, df in parts:
+        segment_doc_ids, segment_freqs = segment.indexer.postings.read(offset, df)
+        doc_ids.append(segment_doc_ids + np.uint32(segment.doc_base - doc_base))
+        freqs.append(segment_freqs)
+    if len(doc_ids) == 1:
+        return doc_ids[0], freqs[0]
+    return np.concatenate(doc_ids), np.concatenate(freqs)
+
+
+def _write_segment(directory, term_postings, names, n_docs, total_docs):
+    # Escribe un segmento a partir de (term, doc_ids, freqs) en orden de
+    # termino. Las normas guardadas usan las estadisticas locales del segmento,
+    # igual que un segmento recien indexado.
+    target = Indexer(index_dir=directory)
+    os.makedirs(directory, exist_ok=True)
+    target._begin_generation()
+    stats = DocStatsAccumulator(n_docs, total_docs)
+    vocab = {}
+    offset = 0
+    with open(target.PATH_POSTINGS, "wb") as p_file:
+        for term, doc_ids, freqs in term_postings:
+            vocab[term] = (offset, len(doc_ids))
+            offset += write_postings(p_file, doc_ids, freqs)
+            stats.add_term(doc_ids, freqs)
+    write_term_dictionary(target.PATH_VOCAB, target.PATH_VOCAB_INDEX, vocab)
+    stats.save(target.PATH_DOC_NORMS, target.PATH_DOC_LENGTHS)
+    write_docnames(target.PATH_DOCNAMES_OFFSETS, target.PATH_DOCNAMES, names)
+    target.doc_count = total_docs
+    target._commit_generation()
+
+
+def merge_segments(segments, directory):
+    # Escribe en `directory` un segmento con los documentos de `segments`
+    # (vecinos, en orden de doc_base). Los documentos borrados se copian igual
+    # para no cambiar los doc_id; su bitset se traslada al segmento nuevo.
+    doc_base = segments[0].doc_base
+    term_postings = (
+        (term, *_gather_postings(parts, doc_base))
+        for term, parts in iter_term_groups(segments)
+    )
+    _write_segment(
+        directory,
+        term_postings,
+        (name for segment in segments for name in segment.indexer.docnames),
+        sum(segment.n_docs for segment in segments),
+        sum(segment.indexer.doc_count for segment in segments),
+    )
+
+
+def compact_segment(segment, directory):
+    # Escribe en `directory` el segmento sin sus documentos borrados. Los doc_id
+    # locales se renumeran en orden: el doc_id nuevo de un documento vivo es la
+    # cantidad de documentos vivos anteriores.
+    live = ~segment.deleted
+    remap = (np.cumsum(live) - 1).astype(np.uint32)
+    postings = segment.indexer.postings
+
+    def term_postings():
+        for term, (offset, df) in segment.indexer.index.items():
+            doc_ids, freqs = postings.read(offset, df)
+            keep = live[doc_ids]
+            if keep.any():
+                yield term, remap[doc_ids[keep]], freqs[keep]
+
+    names = [
+        name
+        for name, is_live in zip(segment.indexer.docnames, live.tolist())
+        if is_live
+    ]
+    _write_segment(directory, term_postings(), names, len(names), segment.doc_count)
+
+
+def merge_level(n_docs, merge_factor, min_segment_docs):
+    # Nivel logaritmico: los segmentos con hasta min_segment_docs documentos son
+    # nivel 0, los hasta merge_factor veces mas grandes nivel 1, y asi.
+    if n_docs <= min_segment_docs:
+        return 0
+    return int(math.log(n_docs / min_segment_docs, merge_factor)) + 1
+
+
+def find_merge(segments, merge_factor, min_segment_docs):
+    # Primeros merge_factor segmentos de un tramo de vecinos del mismo nivel, o
+    # None si ningun tramo llega a merge_factor.
+    levels = [
+        merge_level(segment.n_docs, merge_factor, min_segment_docs)
+        for segment in segments
+    ]
+    start = 0
+    for i in range(1, len(segments) + 1):
+        if i == len(segments) or levels[i] != levels[start]:
+            if i - start >= merge_factor:
+                return segments[start : start + merge_factor]
+            start = i
+    return None
+
+
+class SegmentedIndex:
+    # Implementa la misma interfaz que usan TaatRetriever y DaatRetriever del
+    # Indexer (index_directory, build_vocabulary, load_index, search,
+    # getAllDocsID, getDocNorms, doc_count, ...), asi que se puede pasar como
+    # `indexer`. Cada index_directory + build_vocabulary agrega un segmento.
+    def __init__(
+        self,
+        index_dir="index",
+        saveNorms=False,
+        extractor="auto",
+        merge_factor=4,
+        min_segment_docs=250,
+        background_merges=True,
+    ):
+        self.index_dir = index_dir
+        self.saveNorms = saveNorms
+        self.extractor = extractor
+        self.merge_factor = merge_factor
+        self.min_segment_docs = min_segment_docs
+        self.background_merges = background_merges
+        self.PATH_SEGMENTS = os.path.join(index_dir, SEGMENTS_FILE)
+        # La lista de segmentos se reemplaza entera en cada cambio, asi que una
+        # consulta que tomo la lista sigue viendo un conjunto consistente.
+        self.segments = []
+        self.next_doc_id = 0
+        self.next_segment = 0
+        self.pending = None
+        self._lock = threading.Lock()
+        # Serializa los cambios de estructura (merges y compactacion); se
+        # toma siempre antes que _lock.
+        self._write_lock = threading.RLock()
+        self._merge_thread = None
+        self._norms = None
+        self._lengths = None
+        self._term_ids = None
+        os.makedirs(index_dir, exist_ok=True)
+        entries = self._read_state()
+        if entries is not None:
+            self.segments = self._open_segments(entries)
+        self._remove_unused_dirs()
+
+    # --- estado en disco ---
+
+    def _read_state(self):
+        if not os.path.exists(self.PATH_SEGMENTS):
+            return None
+        with open(self.PATH_SEGMENTS, encoding="utf-8") as f:
+            state = json.load(f)
+        self.next_doc_id = state["next_doc_id"]
+        self.next_segment = state["next_segment"]
+        return state["segments"]
+
+    def _save_state(self):
+        state = {
+            "next_doc_id": self.next_doc_id,
+            "next_segment": self.next_segment,
+            "segments": [
+                {
+                    "name": segment.name,
+                    "doc_base": segment.doc_base,
+                    "n_docs": segment.n_docs,
+                }
+                for segment in self.segments
+            ],
+        }
+        write_json_atomic(self.PATH_SEGMENTS, state)
+
+    def _new_segment_name(self):
+        name = f"seg_{self.next_segment:06d}"
+        self.next_segment += 1
+        return name
+
+    def _segment_dir(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def _remove_unused_dirs(self):
+        # Al abrir el indice: segmentos reemplazados por un merge que no se
+        # pudieron borrar, o que quedaron a medio escribir.
+        live = {segment.name for segment in self.segments}
+        for entry in os.listdir(self.index_dir):
+            if entry.startswith("seg_") and entry not in live:
+                shutil.rmtree(os.path.join(self.index_dir, entry), ignore_errors=True)
+
+    # --- escritura ---
+
+    def index_directory(
+        self, path: Path, docs_per_chunk=0, workers=1, memory_budget_mb=0
+    ):
+        with self._lock:
+            name = self._new_segment_name()
+        indexer = Indexer(self.saveNorms, self.extractor, self._segment_dir(name))
+        self.pending = (name, indexer)
+        indexer.index_directory(path, docs_per_chunk, workers, memory_budget_mb)
+
+    def build_vocabulary(self):
+        if self.pending is None:
+            return
+        name, indexer = self.pending
+        self.pending = None
+        if indexer.file_index == 0:
+            shutil.rmtree(indexer.index_dir, ignore_errors=True)
+            return
+        indexer.build_vocabulary()
+        shutil.rmtree(indexer.PATH_CHUNKS.parent, ignore_errors=True)
+
+        with self._lock:
+            segment = Segment(name, indexer.index_dir, self.next_doc_id)
+            self.next_doc_id += segment.n_docs
+            self.segments = self.segments + [segment]
+            self._clear_caches()
+            self._save_state()
+        self.maybe_merge()
+
+    def add_directory(self, path: Path, docs_per_chunk=0, workers=1):
+        self.index_directory(path, docs_per_chunk, workers)
+        self.build_vocabulary()
+
+    def add_documents(self, documents, docs_per_chunk=250):
+        # Agrega un segmento con documentos en memoria: pares (docname, html).
+        with self._lock:
+            name = self._new_segment_name()
+        indexer = Indexer(self.saveNorms, self.extractor, self._segment_dir(name))
+        self.pending = (name, indexer)
+        indexer.index_documents(documents, docs_per_chunk)
+        self.build_vocabulary()
+
+    # --- borrado y actualizacion ---
+
+    def _find_live(self, docname):
+        # doc_ids globales de los documentos vivos con ese nombre.
+        return [
+            segment.doc_base + doc_id
+            for segment in self.segments
+            for doc_id in segment.find(docname)
+        ]
+
+    def _delete_ids(self, doc_ids):
+        for segment in self.segments:
+            local_ids = [
+                doc_id - segment.doc_base
+                for doc_id in doc_ids
+                if segment.doc_base <= doc_id < segment.doc_base + segment.n_docs
+            ]
+            if local_ids:
+                segment.delete(local_ids)
+        if doc_ids:
+            # Las normas y longitudes se vuelven a armar en la proxima
+            # consulta; los numeros de termino no cambian con un borrado.
+            self._norms = None
+            self._lengths = None
+
+    def _clear_caches(self):
+        # Normas y longitudes armadas para la lista de segmentos anterior. Al
+        # descartarlas tambien se sueltan los segmentos reemplazados, que si no
+        # seguirian referenciados (y en disco) hasta la proxima consulta.
+        self._norms = None
+        self._lengths = None
+        self._term_ids = None
+
+    def delete(self, docname):
+        # Marca como borrados los documentos con ese nombre y devuelve cuantos
+        # eran. Dejan de aparecer en las consultas y de contar en N y en los df.
+        with self._lock:
+            doc_ids = self._find_live(docname)
+            self._delete_ids(doc_ids)
+        return len(doc_ids)
+
+    def update(self, docname, html):
+        # Reemplaza el documento: agrega la version nueva en un segmento y
+        # despues borra las anteriores. Mientras tanto no hay merges ni
+        # compactacion, asi que los doc_id globales no cambian.
+        with self._write_lock:
+            with self._lock:
+                doc_ids = self._find_live(docname)
+            self.add_documents([(docname, html)])
+            with self._lock:
+                self._delete_ids(doc_ids)
+
+    def compact(self):
+        # Reescribe los segmentos con documentos borrados sin esos documentos
+        # (los segmentos sin documentos vivos se descartan) y renumera los doc_id
+        # globales de todos los segmentos. Devuelve los documentos eliminados.
+        with self._write_lock, self._lock:
+            removed = 0
+            replaced = []
+            segments = []
+            doc_base = 0
+            for segment in self.segments:
+                if segment.n_deleted:
+                    replaced.append(segment)
+                    removed += segment.n_deleted
+                    if segment.n_deleted == segment.n_docs:
+                        continue
+                    name = self._new_segment_name()
+                    compact_segment(segment, self._segment_dir(name))
+                    new_segment = Segment(name, self._segment_dir(name), doc_base)
+                else:
+                    new_segment = copy.copy(segment)
+                    new_segment.doc_base = doc_base
+                segments.append(new_segment)
+                doc_base += new_segment.n_docs
+            if not replaced:
+                return 0
+            self.segments = segments
+            self.next_doc_id = doc_base
+            self._clear_caches()
+            self._save_state()
+        _retire_segments(replaced)
+        print(f" --- Compactacion: {removed} documentos eliminados.")
+        return removed
+
+    # --- merges ---
+
+    def maybe_merge(self):
+        if not self.background_merges:
+            self._run_merges()
+            return
+        with self._lock:
+            if self._merge_thread is not None and self._merge_thread.is_alive():
+                return
+            self._merge_thread = threading.Thread(target=self._run_merges, daemon=True)
+            self._merge_thread.start()
+
+    def wait_for_merges(self):
+        thread = self._merge_thread
+        if thread is not None:
+            thread.join()
+
+    def _run_merges(self):
+        while True:
+            with self._write_lock:
+                with self._lock:
+                    run = find_merge(
+                        self.segments, self.merge_factor, self.min_segment_docs
+                    )
+                    if run is None:
+                        return
+                    name = self._new_segment_name()
+                directory = self._segment_dir(name)
+                merge_segments(run, directory)
+
+                with self._lock:
+                    self._swap_merged(run, name, directory)
+            _retire_segments(run)
+
+    def _swap_merged(self, run, name, directory):
+        merged = Segment(name, directory, run[0].doc_base)
+        # Los borrados hechos durante el merge tambien se trasladan.
+        if any(segment.n_deleted for segment in run):
+            deleted = np.concatenate(
+                [
+                    segment.deleted
+                    if segment.deleted is not None
+                    else np.zeros(segment.n_docs, dtype=bool)
+                    for segment in run
+                ]
+            )
+            merged.delete(np.flatnonzero(deleted))
+        start = self.segments.index(run[0])
+        self.segments = (
+            self.segments[:start] + [merged] + self.segments[start + len(run) :]
+        )
+        self._clear_caches()
+        self._save_state()
+        print(
+            f" --- Merge de {len(run)} segmentos en {name} "
+            f"({merged.n_docs} documentos)."
+        )
+
+    # --- lectura ---
+
+    def load_index(self):
+        print(f"\nCargando indice desde el archivo a la memora.\n")
+        entries = self._read_state()
+        if entries is None:
+            print("[ERROR]: Segmentos no encontrados.")
+            return
+        segments = self._open_segments(entries)
+        with self._lock:
+            self.segments = segments
+            self._clear_caches()
+
+    def _open_segments(self, entries):
+        return [
+            Segment(entry["name"], self._segment_dir(entry["name"]), entry["doc_base"])
+            for entry in entries
+        ]
+
+    @property
+    def doc_count(self):
+        return sum(segment.doc_count for segment in self.segments)
+
+    def get_postings(self, term):
+        parts = [segment.get_postings(term) for segment in self.segments]
+        parts = [part for part in parts if len(part[0])]
+        if not parts:
+            return EMPTY_POSTINGS
+        if len(parts) == 1:
+            return parts[0]
+        return (
+            np.concatenate([doc_ids for doc_ids, _ in parts]),
+            np.concatenate([freqs for _, freqs in parts]),
+        )
+
+    def search(self, term):
+        # Igual que Indexer.search, con doc_ids globales: df = len(resultado)
+        # ya cuenta los documentos de todos los segmentos.
+        postings = []
+        for segment in self.segments:
+            doc_ids, freqs = segment.live_postings(
+                *segment.indexer.get_postings(term)
+            )
+            docnames = segment.indexer.docnames
+            doc_base = segment.doc_base
+            postings.extend(
+                (docnames[doc_id], doc_base + doc_id, freq)
+                for doc_id, freq in zip(doc_ids.tolist(), freqs.tolist())
+            )
+        return postings
+
+    def getAllDocsID(self):
+        result = []
+        for segment in self.segments:
+            for doc_id, docname in enumerate(segment.indexer.docnames):
+                if docname and not segment.is_deleted(doc_id):
+                    result.append((docname, segment.doc_base + doc_id))
+        return result
+
+    def isTermInVocab(self, term):
+        return any(term in segment.indexer.index for segment in self.segments)
+
+    def getDocNorms(self):
+        # Las normas de cada segmento usan su N y sus df locales; con mas de un
+        # segmento, o con borrados, se recalculan con las estadisticas globales
+        # de los documentos vivos y se guardan hasta el proximo cambio. Recorrer
+        # los vocabularios se hace una vez por lista de segmentos: despues de
+        # un borrado solo se recalcula sobre los arreglos (global_term_ids).
+        segments = self.segments
+        norms = self._norms
+        if norms is not None and norms[0] is segments:
+            return norms[1]
+        single = len(segments) == 1 and segments[0].doc_base == 0
+        if single and not segments[0].n_deleted:
+            values = segments[0].indexer.getDocNorms()
+        else:
+            term_ids = self._term_ids
+            if term_ids is None or term_ids[0] is not segments:
+                term_ids = (segments, *global_term_ids(segments))
+                self._term_ids = term_ids
+            values = live_doc_norms(
+                segments, *term_ids[1:], self.next_doc_id, self.doc_count
+            )
+        self._norms = (segments, values)
+        return values
+
+    def getDocLengths(self):
+        # Como las normas, se arma una vez por lista de segmentos (y otra vez
+        # despues de un borrado). Los documentos borrados tienen longitud 0.
+        segments = self.segments
+        cached = self._lengths
+        if cached is not None and cached[0] is segments:
+            return cached[1]
+        lengths = np.zeros(self.next_doc_id, dtype=np.uint32)
+        for segment in segments:
+            segment_lengths = segment.indexer.getDocLengths()
+            if segment.n_deleted:
+                segment_lengths = np.where(
+                    segment.deleted[: len(segment_lengths)], 0, segment_lengths
+                )
+            lengths[segment.doc_base : segment.doc_base + len(segment_lengths)] = (
+                segment_lengths
+            )
+        self._lengths = (segments, lengths)
+        return lengths
+
+    def getAvgDocLength(self):
+        # Promedio sobre los documentos vivos, igual que en el indice que queda
+        # despues de compactar.
+        n_docs = self.doc_count
+        return float(self.getDocLengths().sum()) / n_docs if n_docs else 0.0
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Agrega documentos a un indice por segmentos"
+    )
+    parser.add_argument("index_dir", type=str, help="Directorio del indice")
+    parser.add_argument(
+        "paths", type=str, nargs="*", help="Directorios de documentos HTML a agregar"
+    )
+    parser.add_argument("--docs", type=int, default=0, help="Documentos por chunk")
+    parser.add_argument("--merge-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    index = SegmentedIndex(args.index_dir, merge_factor=args.merge_factor)
+    index.load_index()
+    for path in args.paths:
+        index.add_directory(Path(path), args.docs)
+    index.wait_for_merges()
+
+    print(f"\n{len(index.segments)} segmentos, {index.doc_count} documentos.")
+    for segment in index.segments:
+        print(f" -- {segment.name}: doc_base {segment.doc_base}, {segment.n_docs} docs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+from contextlib import ExitStack
+import numpy as np
+from TP4.EJ1.indexer import Indexer
+from TP4.EJ1.docnames import write_docnames
+from TP4.EJ1.termdict import TermDictionary, write_term_dictionary
+from TP4.EJ1.runs import write_postings
+from TP4.EJ1.manifest import write_json_atomic
+
+
+# Indice particionado por documentos. Cada shard es un indice completo del
+# Indexer (en su propio directorio) con los documentos de un rango contiguo de
+# doc_id; los doc_id globales son doc_base + doc_id local, como en los
+# segmentos.
+#
+# Las estadisticas de la coleccion son globales: las normas y longitudes de
+# cada shard son las del indice completo, y el directorio `global` guarda el
+# df de cada termino en toda la coleccion. Asi el score de un documento es el
+# mismo que en el indice sin particionar, sin importar en que shard este.
+
+SHARDS_FILE = "shards.json"
+GLOBAL_DIR = "global"
+
+
+def shard_bounds(n_docs, n_shards):
+    # Limites [lo, hi) de cada shard, con rangos de doc_id de igual tamaño.
+    return np.linspace(0, n_docs, n_shards + 1).astype(np.int64).tolist()
+
+
+def build_shards(indexer, shards_dir, n_shards):
+    # Parte el indice ya cargado de `indexer` en n_shards shards. Recorre el
+    # vocabulario una sola vez y reparte las postings de cada termino entre los
+    # shards con una busqueda binaria sobre sus doc_id ordenados.
+    docnames = indexer.docnames
+    n_docs = len(docnames)
+    bounds = shard_bounds(n_docs, n_shards)
+    os.makedirs(shards_dir, exist_ok=True)
+
+    targets = []
+    for number in range(n_shards):
+        directory = os.path.join(shards_dir, f"shard_{number:03d}")
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        target = Indexer(
+            index_dir=directory, fields=indexer.getFieldLengths() is not None
+        )
+        target._begin_generation()
+        targets.append(target)
+
+    vocabs = [{} for _ in targets]
+    offsets = [0] * n_shards
+    global_vocab = {}
+    with ExitStack() as stack:
+        files = [stack.enter_context(open(t.PATH_POSTINGS, "wb")) for t in targets]
+        for term, (_, df) in indexer.index.items():
+            global_vocab[term] = (0, df)
+            doc_ids, freqs = indexer.get_postings(term)
+            cuts = np.searchsorted(doc_ids, bounds)
+            for number in range(n_shards):
+                start, end = cuts[number], cuts[number + 1]
+                if start == end:
+                    continue
+                vocabs[number][term] = (offsets[number], int(end - start))
+                offsets[number] += write_postings(
+                    files[number],
+                    doc_ids[start:end] - bounds[number],
+                    freqs[start:end],
+                )
+
+    norms = indexer.getDocNorms()
+    lengths = indexer.getDocLengths()
+    field_lengths = indexer.getFieldLengths()
+    entries = []
+    for number, target in enumerate(targets):
+        lo, hi = bounds[number], bounds[number + 1]
+        write_term_dictionary(
+            target.PATH_VOCAB, target.PATH_VOCAB_INDEX, vocabs[number]
+        )
+        np.asarray(norms[lo:hi]).tofile(target.PATH_DOC_NORMS)
+        np.asarray(lengths[lo:hi]).tofile(target.PATH_DOC_LENGTHS)
+        if field_lengths is not None:
+            np.asarray(field_lengths[lo:hi]).tofile(target.PATH_FIELD_LENGTHS)
+        names = [docnames[doc_id] for doc_id in range(lo, hi)]
+        write_docnames(target.PATH_DOCNAMES_OFFSETS, target.PATH_DOCNAMES, names)
+        target.doc_count = sum(1 for name in names if name)
+        target._commit_generation()
+        entries.append(
+            {
+                "name": os.path.basename(target.index_dir),
+                "doc_base": lo,
+                "n_docs": hi - lo,
+            }
+        )
+
+    global_dir = os.path.join(shards_dir, GLOBAL_DIR)
+    os.makedirs(global_dir, exist_ok=True)
+    write_term_dictionary(
+        os.path.join(global_dir, "vocabulary.bin"),
+        os.path.join(global_dir, "vocabulary_index.bin"),
+        global_vocab,
+    )
+    state = {
+        "doc_count": indexer.doc_count,
+        "avg_doc_length": float(lengths.mean()) if len(lengths) else 0.0,
+        "shards": entries,
+    }
+    write_json_atomic(os.path.join(shards_dir, SHARDS_FILE), state)
+    print(f"[DEBUG] Escritos {n_shards} shards de {n_docs} documentos.")
+    return state
+
+
+class ShardSet:
+    # Lo que necesita el coordinador: la lista de shards y las estadisticas
+    # globales (N, avgdl y el df de cada termino, mapeado en memoria).
+    def __init__(self, shards_dir):
+        with open(os.path.join(shards_dir, SHARDS_FILE), encoding="utf-8") as f:
+            state = json.load(f)
+        self.shards_dir = shards_dir
+        self.doc_count = state["doc_count"]
+        self.avg_doc_length = state["avg_doc_length"]
+        self.shards = state["shards"]
+        global_dir = os.path.join(shards_dir, GLOBAL_DIR)
+        self.index = TermDictionary(
+            os.path.join(global_dir, "vocabulary.bin"),
+            os.path.join(global_dir, "vocabulary_index.bin"),
+        )
+
+    def shard_dir(self, shard):
+        return os.path.join(self.shards_dir, shard["name"])
+
+    def df(self, term):
+        entry = self.index.get(term)
+        return 0 if entry is None else entry[1]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Parte un indice en shards por rango de doc_id"
+    )
+    parser.add_argument("index_dir", type=str, help="Directorio del indice completo")
+    parser.add_argument("shards_dir", type=str, help="Directorio de salida")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    indexer = Indexer(index_dir=args.index_dir)
+    indexer.load_index()
+    state = build_shards(indexer, args.shards_dir, args.shards)
+    for shard in state["shards"]:
+        print(
+            f" -- {shard['name']}: doc_base {shard['doc_base']}, "
+            f"{shard['n_docs']} docs"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import mmap
+import os
+import struct
+import numpy as np
+
+
+# Diccionario de terminos ordenado y con front coding por bloques.
+#
+# El archivo de terminos guarda los terminos en orden (bytes UTF-8), de a
+# BLOCK_SIZE por bloque. Cada entrada es:
+#   prefijo compartido con el termino anterior (u4), largo del sufijo (u4),
+#   sufijo, offset en postings (u8), df (u4)
+# La primera entrada de cada bloque tiene prefijo 0, asi que el termino
+# completo se puede leer sin decodificar el bloque anterior. Los largos son u4
+# porque el analizador no limita el largo de los tokens: un documento valido
+# puede tener un token de mas de 65535 bytes.
+#
+# El archivo de indice es un arreglo uint64: [cantidad de terminos,
+# BLOCK_SIZE, offset del bloque 0, offset del bloque 1, ...].
+
+BLOCK_SIZE = 16
+
+_ENTRY_HEAD = struct.Struct("<II")
+_ENTRY_TAIL = struct.Struct("<QI")
+
+
+def write_term_dictionary(terms_path, index_path, vocab, block_size=BLOCK_SIZE):
+    # vocab: {term: (offset, df)}. Se ordena por los bytes UTF-8, que es el
+    # mismo orden que el de los str de Python.
+    entries = sorted(
+        (term.encode("utf-8"), offset, df) for term, (offset, df) in vocab.items()
+    )
+    block_offsets = []
+    position = 0
+    previous = b""
+    with open(terms_path, "wb") as f:
+        for i, (term, offset, df) in enumerate(entries):
+            if i % block_size == 0:
+                block_offsets.append(position)
+                prefix = 0
+            else:
+                prefix = _common_prefix(previous, term)
+            suffix = term[prefix:]
+            record = (
+                _ENTRY_HEAD.pack(prefix, len(suffix))
+                + suffix
+                + _ENTRY_TAIL.pack(offset, df)
+            )
+            f.write(record)
+            position += len(record)
+            previous = term
+    header = [len(entries), block_size]
+    np.array(header + block_offsets, dtype=np.uint64).tofile(index_path)
+
+
+def _common_prefix(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class TermDictionary:
+    # Se usa como el dict {term: (offset, df)} anterior (in, [], get, len,
+    # items), pero sin cargar el vocabulario: el indice de bloques y los
+    # terminos estan mapeados en memoria. Una busqueda es una busqueda binaria
+    # sobre el primer termino de cada bloque y un recorrido de un solo bloque.
+    def __init__(self, terms_path, index_path):
+        with open(index_path, "rb") as f:
+            index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # memoryview en lugar de np.memmap: leer un escalar es mucho mas barato.
+        index = memoryview(index).cast("Q")
+        self.n_terms = index[0]
+        self.block_size = index[1]
+        self.block_offsets = index[2:]
+        if os.path.getsize(terms_path) > 0:
+            with open(terms_path, "rb") as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.data = b""
+
+    def __len__(self):
+        return self.n_terms
+
+    def _first_term(self, block):
+        position = self.block_offsets[block]
+        _, length = _ENTRY_HEAD.unpack_from(self.data, position)
+        start = position + _ENTRY_HEAD.size
+        return self.data[start : start + length]
+
+    def _find_block(self, key):
+        # Ultimo bloque cuyo primer termino es <= key (0 si key es menor a todos).
+        lo, hi = 0, len(self.block_offsets)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._first_term(mid) <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return max(lo - 1, 0)
+
+    def _iter_entries(self, block):
+        # Entradas (term en bytes, offset, df) desde el comienzo de `block`
+        # hasta el final del diccionario.
+        data = self.data
+        position = self.block_offsets[block] if self.n_terms else 0
+        term = b""
+        for _ in range(block * self.block_size, self.n_terms):
+            prefix, length = _ENTRY_HEAD.unpack_from(data, position)
+            position += _ENTRY_HEAD.size
+            term = term[:prefix] + data[position : position + length]
+            position += length
+            offset, df = _ENTRY_TAIL.unpack_from(data, position)
+            position += _ENTRY_TAIL.size
+            yield term, offset, df
+
+    def get(self, term, default=None):
+        if not self.n_terms:
+            return default
+        key = term.encode("utf-8")
+        block = self._find_block(key)
+        entries = self._iter_entries(block)
+        for _ in range(self.block_size):
+            entry = next(entries, None)
+            if entry is None or entry[0] > key:
+                break
+            if entry[0] == key:
+                return entry[1], entry[2]
+        return default
+
+    def __getitem__(self, term):
+        value = self.get(term)
+        if value is None:
+            raise KeyError(term)
+        return value
+
+    def __contains__(self, term):
+        return self.get(term) is not None
+
+    def items_from(self, start=""):
+        # Recorre en orden los terminos >= start.
+        if not self.n_terms:
+            return
+        key = start.encode("utf-8")
+        for term, offset, df in self._iter_entries(self._find_block(key)):
+            if term >= key:
+                yield term.decode("utf-8"), (offset, df)
+
+    def items(self):
+        return self.items_from()
+
+    def keys(self):
+        for term, _ in self.items_from():
+            yield term
+
+    def __iter__(self):
+        return self.keys()
+
+    def prefix(self, prefix):
+        # Terminos que empiezan con `prefix`, en orden.
+        for term, value in self.items_from(prefix):
+            if not term.startswith(prefix):
+                break
+            yield term, value
+
+    def range(self, low, high):
+        # Terminos t con low <= t < high, en orden.
+        for term, value in self.items_from(low):
+            if term >= high:
+                break
+            yield term, value
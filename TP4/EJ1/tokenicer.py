@@ -1,47 +1,138 @@
-from collections import defaultdict
+from collections import defaultdict, Counter
+from array import array
+import codecs
+import os
 import re
-import heapq
-import platform
+import string
 import tempfile
 import subprocess
-import nltk
-from nltk.corpus import stopwords
+from TP4.EJ1.stopwords import get_stopwords
+from TP4.EJ1.extractors import StreamingExtractor
+
+
+# Equivalente en proceso del pipeline `tr | sed` de _sort_words_unix:
+# `tr '[:upper:]' '[:lower:]'` solo pasa a minusculas los caracteres ASCII, y
+# `sed 's/[^a-záéíóúñü]/ /g'` convierte todo lo demas en separadores.
+_LOWER_ASCII = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+_TOKEN_RE = re.compile(r"[a-záéíóúñü]+")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.translate(_LOWER_ASCII))
+
+
+def iter_tokens(text):
+    for match in _TOKEN_RE.finditer(text.translate(_LOWER_ASCII)):
+        yield match.group()
+
+
+def _iter_blocks(stream, block_size):
+    if hasattr(stream, "read"):
+        while True:
+            block = stream.read(block_size)
+            if not block:
+                return
+            yield block
+    else:
+        yield from stream
+
+
+def iter_tokens_stream(stream, block_size=1 << 16):
+    # Version incremental de iter_tokens para documentos que no conviene tener
+    # enteros en memoria. `stream` puede ser un archivo (texto o binario) o un
+    # iterable de bloques str/bytes; los bytes se decodifican como UTF-8 de forma
+    # incremental, asi que un caracter multibyte partido entre bloques no se pierde.
+    # Un token que toca el final del bloque puede seguir en el proximo, por lo que
+    # se guarda en `carry` y se antepone al bloque siguiente.
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    carry = ""
+    for block in _iter_blocks(stream, block_size):
+        if isinstance(block, bytes):
+            block = decoder.decode(block)
+        text = carry + block.translate(_LOWER_ASCII)
+        carry = ""
+        for match in _TOKEN_RE.finditer(text):
+            if match.end() == len(text):
+                carry = match.group()
+                break
+            yield match.group()
+    text = carry + decoder.decode(b"", final=True).translate(_LOWER_ASCII)
+    yield from _TOKEN_RE.findall(text)
 
 
 class TextProcessor:
-    def __init__(self):
-        nltk.download("stopwords", quiet=True)
-        self.stopwords = set(stopwords.words("english"))
+    def __init__(self, use_nltk=False):
+        self.use_nltk = use_nltk
+        self.stopwords = get_stopwords("english", use_nltk)
 
     def sort_words(self, text):
-        if platform.system() == "Windows":
-            return self._sort_words_windows(text)
-        else:
-            return self._sort_words_unix(text)
-
-    def _sort_words_windows(self, text):
-        heap = []
-        for line in text.splitlines():
-            line = re.sub(r"[^a-záéíóúñü\s]", " ", line.lower())
-            for word in line.split():
-                heapq.heappush(heap, word)
-        words = []
-        while heap:
-            words.append(heapq.heappop(heap))
-        return words
+        return sorted(tokenize(text))
 
     def _sort_words_unix(self, text):
+        # Pipeline original, se conserva solo como referencia para comparar
+        # resultados contra tokenize().
         with tempfile.NamedTemporaryFile(
             mode="w+", delete=False, encoding="utf-8"
         ) as tmp:
             tmp.write(text)
-            tmp.flush()
+        try:
             command = (
                 f"cat {tmp.name} | tr '[:upper:]' '[:lower:]' | tr -s '[:space:]' '\\n' "
                 f"| sed 's/[^a-záéíóúñü]/ /g' | tr -s ' ' '\\n' | sed '/^$/d' | sort"
             )
-            result = subprocess.run(command, shell=True, capture_output=True, text=True)
+            # Con un locale que no es UTF-8 (LC_ALL=C) tr y sed trabajan byte a
+            # byte y parten las letras acentuadas; se fija uno para comparar.
+            result = subprocess.run(
+                command,
+                shell=True,
+                capture_output=True,
+                encoding="utf-8",
+                env={**os.environ, "LC_ALL": "C.UTF-8"},
+            )
             return result.stdout.strip().split("\n")
+        finally:
+            os.unlink(tmp.name)
+
+    def count(self, text):
+        # Mismo resultado que process(), pero contando con un hash en O(n)
+        # en lugar de ordenar los tokens para hacer el corte de control.
+        stopwords = self.stopwords
+        return Counter(
+            word
+            for word in iter_tokens(text)
+            if len(word) > 3 and word not in stopwords
+        )
+
+    def positions(self, text):
+        # Como count(), pero guarda las posiciones de cada termino: el indice
+        # del token en el texto, contando tambien los tokens descartados, asi
+        # una frase con stopwords en el medio sigue respetando las distancias.
+        # Los terminos quedan en el mismo orden de primera aparicion.
+        stopwords = self.stopwords
+        positions = {}
+        for position, word in enumerate(iter_tokens(text)):
+            if len(word) > 3 and word not in stopwords:
+                term_positions = positions.get(word)
+                if term_positions is None:
+                    positions[word] = array("I", [position])
+                else:
+                    term_positions.append(position)
+        return positions
+
+    def iter_terms(self, stream, block_size=1 << 16):
+        # Terminos de un documento HTML que se lee de a bloques desde `stream`
+        # (archivo de texto o binario): StreamingExtractor saca el texto
+        # visible y se tokeniza a medida que aparece, sin tener el documento
+        # entero en memoria.
+        stopwords = self.stopwords
+        text = StreamingExtractor().iter_text(stream, block_size)
+        for word in iter_tokens_stream(text):
+            if len(word) > 3 and word not in stopwords:
+                yield word
+
+    def count_stream(self, stream, block_size=1 << 16):
+        # Mismo resultado que count(StreamingExtractor().extract(html)).
+        return Counter(self.iter_terms(stream, block_size))
 
     def process(self, text):
         words = self.sort_words(text)
@@ -0,0 +1,56 @@
+import math
+import numpy as np
+
+
+class BM25:
+    # Okapi BM25 sobre las longitudes de documento guardadas en el indice
+    # (doc_lengths.bin). Para un termino con df documentos y un documento de
+    # longitud dl:
+    #   idf = log(1 + (N - df + 0.5) / (df + 0.5))
+    #   score = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+    # El factor de longitud de cada documento depende solo de k1, b y avgdl, asi
+    # que se calcula una vez por generacion del indice; lo que depende del
+    # termino (idf, k1 + 1 y la frecuencia en la query) se junta en un peso por
+    # termino, una vez por query.
+    #
+    # Con avgdl fijo se usa ese valor en lugar del promedio de las longitudes
+    # del indice: un shard puntua con el avgdl de la coleccion completa.
+    def __init__(self, indexer, k1=1.2, b=0.75, avgdl=None):
+        self.indexer = indexer
+        self.k1 = k1
+        self.b = b
+        self.avgdl = avgdl
+        self._factors = None
+
+    def doc_factors(self):
+        # k1 * (1 - b + b * dl / avgdl) por doc_id. Se recalcula si el indice
+        # devuelve otro arreglo de longitudes (por ejemplo, despues de refresh()
+        # o de un borrado en un indice por segmentos).
+        lengths = self.indexer.getDocLengths()
+        cached = self._factors
+        if cached is not None and cached[0] is lengths:
+            return cached[1]
+        avgdl = self.avgdl
+        if avgdl is None:
+            avgdl = self.indexer.getAvgDocLength()
+        if avgdl > 0:
+            factors = self.k1 * (1 - self.b + self.b * (lengths / avgdl))
+        else:
+            factors = np.full(len(lengths), self.k1)
+        self._factors = (lengths, factors)
+        return factors
+
+    def term_weight(self, df, q_freq):
+        if df == 0:
+            return 0.0
+        n_docs = self.indexer.doc_count
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        return idf * (self.k1 + 1) * q_freq
+
+    @staticmethod
+    def score(weight, d_freq, factor):
+        return weight * d_freq / (d_freq + float(factor))
+
+    def score_postings(self, weight, doc_ids, freqs):
+        # score() para todas las postings de un termino a la vez.
+        return weight * freqs / (freqs + self.doc_factors()[doc_ids])
@@ -1,20 +1,74 @@
 import re
-import platform
-import tempfile
-import subprocess
-import nltk
-from nltk.corpus import stopwords
-import heapq
+import threading
+from collections import OrderedDict
+from TP4.EJ1.tokenicer import tokenize
+from TP4.EJ1.stopwords import get_stopwords
+from TP4.EJ1.extractors import FIELDS, field_term
+
+
+# `campo:palabra` restringe la palabra a un campo (title:python busca solo en
+# el titulo). Si la palabra tiene varios tokens, todos van al campo.
+_FIELD_RE = re.compile(r"\b(%s):(\S+)" % "|".join(FIELDS))
 
 
 class QueryProcessor:
-    def __init__(self):
-        nltk.download("stopwords")
-        self.stopwords = set(stopwords.words("english"))
+    def __init__(self, use_nltk=False, cache_size=4096):
+        self.stopwords = get_stopwords("english", use_nltk)
+        # Cache LRU de queries ya analizadas, indexado por el texto crudo.
+        # Las entradas son tuplas de tuplas para que nadie pueda modificarlas.
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Un retriever puede atender consultas desde varios hilos (ver
+        # ShardedRetriever.searchQuery): get + move_to_end y la insercion con
+        # desalojo no son atomicos. El analisis se hace fuera del lock.
+        self._cache_lock = threading.Lock()
 
     def process_query(self, text: str):
+        if self.cache_size <= 0:
+            return self._analyze_query(text)
+
+        with self._cache_lock:
+            cached = self.cache.get(text)
+            if cached is not None:
+                self.cache.move_to_end(text)
+                self.cache_hits += 1
+                return cached
+            self.cache_misses += 1
+
+        output = self._analyze_query(text)
+        with self._cache_lock:
+            self.cache[text] = output
+            self.cache.move_to_end(text)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return output
+
+    def cache_info(self):
+        with self._cache_lock:
+            return {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "size": len(self.cache),
+                "capacity": self.cache_size,
+            }
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self.cache.clear()
+            self.cache_hits = 0
+            self.cache_misses = 0
+
+    def _analyze_query(self, text: str):
         output = []
-        sorted_words = self.sort_words(text)
+        field_words = [
+            field_term(field, word)
+            for field, value in _FIELD_RE.findall(text)
+            for word in tokenize(value)
+            if len(word) > 3 and word not in self.stopwords
+        ]
+        sorted_words = sorted(self.sort_words(_FIELD_RE.sub(" ", text)) + field_words)
         i = 0
         while i < len(sorted_words):
             word = sorted_words[i]
@@ -28,35 +82,16 @@ class QueryProcessor:
             if word not in self.stopwords:
                 output.append((word, term_count))
             i += 1
-        return output
+        return tuple(output)
+
+    def process_phrase(self, text: str):
+        # Terminos de una frase en orden, con su posicion relativa dentro de la
+        # frase (contando los tokens descartados, igual que en el indice).
+        return tuple(
+            (word, position)
+            for position, word in enumerate(tokenize(text))
+            if len(word) > 3 and word not in self.stopwords
+        )
 
     def sort_words(self, text):
-        if platform.system() == "Windows":
-            return self.sort_words_windows(text)
-        else:
-            return self.sort_words_unix(text)
-
-    def sort_words_unix(self, text):
-        with tempfile.NamedTemporaryFile(
-            mode="w+", delete=False, encoding="utf-8"
-        ) as tmp:
-            tmp.write(text)
-            tmp.flush()
-            command = (
-                f"cat {tmp.name} | tr '[:upper:]' '[:lower:]' | tr -s '[:space:]' '\n' "
-                f"| sed 's/[^a-záéíóúñü]/ /g' | tr -s ' ' '\n' | sed '/^$/d' | sort"
-            )
-            result = subprocess.run(command, shell=True, capture_output=True, text=True)
-            words = result.stdout.strip().split("\n")
-            return words
-
-    def sort_words_windows(self, text):
-        heap = []
-        for line in text.splitlines():
-            line = re.sub(r"[^a-záéíóúñü\s]", " ", line.lower())
-            for word in line.split():
-                heapq.heappush(heap, word)
-        words = []
-        while heap:
-            words.append(heapq.heappop(heap))
-        return words
+        return sorted(tokenize(text))
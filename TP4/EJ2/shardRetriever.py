@@ -0,0 +1,185 @@
+from TP4.EJ1.indexer import Indexer
+from TP4.EJ1.shards import ShardSet
+from TP4.EJ2.queryProcessor import QueryProcessor
+from TP4.EJ2.bm25 import BM25
+from itertools import islice
+from multiprocessing import Pipe, Process
+import argparse
+import heapq
+import math
+import threading
+import numpy as np
+
+
+# Consultas rankeadas sobre un indice particionado en shards (TP4/EJ1/shards.py).
+# El coordinador analiza la query y calcula el peso de cada termino con las
+# estadisticas globales; cada shard lo atiende un proceso propio, que tiene su
+# indice mapeado en memoria y devuelve su top-k. El coordinador mezcla esos
+# top-k, que ya vienen ordenados, y se queda con los k mejores.
+
+
+def _open_shard(directory, avgdl, k1, b):
+    indexer = Indexer(index_dir=directory)
+    indexer.load_index()
+    return indexer, BM25(indexer, k1, b, avgdl=avgdl)
+
+
+def score_shard(indexer, bm25, doc_base, ranking, term_weights, top):
+    # Top-k del shard como (score, docID global, docname), de mayor a menor.
+    # Se acumula termino a termino en un arreglo del tamaño del shard.
+    n_docs = len(indexer.docnames)
+    scores = np.zeros(n_docs, dtype=np.float64)
+    matched = np.zeros(n_docs, dtype=bool)
+    for term, weight in term_weights:
+        doc_ids, freqs = indexer.get_postings(term)
+        if len(doc_ids) == 0:
+            continue
+        if ranking == "bm25":
+            scores[doc_ids] += bm25.score_postings(weight, doc_ids, freqs)
+        else:
+            scores[doc_ids] += (1 + np.log2(freqs)) * weight
+        matched[doc_ids] = True
+
+    candidates = np.flatnonzero(matched)
+    if len(candidates) > top:
+        candidates = candidates[np.argpartition(-scores[candidates], top - 1)[:top]]
+    candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return [
+        (float(scores[doc_id]), doc_base + doc_id, indexer.docnames[doc_id])
+        for doc_id in candidates.tolist()
+    ]
+
+
+def _shard_worker(conn, directory, doc_base, avgdl, k1, b):
+    # Atiende pedidos (ranking, term_weights, top) hasta recibir None.
+    indexer, bm25 = _open_shard(directory, avgdl, k1, b)
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        conn.send(score_shard(indexer, bm25, doc_base, *request))
+    conn.close()
+
+
+class ShardedRetriever:
+    def __init__(self, shards_dir, ranking="tfidf", k1=1.2, b=0.75, processes=True):
+        if ranking not in ("tfidf", "bm25"):
+            raise ValueError(f"Ranking desconocido: {ranking}")
+        self.shard_set = ShardSet(shards_dir)
+        self.queryProcessor = QueryProcessor()
+        self.ranking = ranking
+        # Solo para los pesos por termino, que usan N y df globales.
+        self.bm25 = BM25(self.shard_set, k1, b)
+        avgdl = self.shard_set.avg_doc_length
+
+        # Con processes=False los shards se consultan uno tras otro en este
+        # proceso (mismos resultados, sirve para comparar).
+        self.workers = []
+        self.local_shards = []
+        for shard in self.shard_set.shards:
+            directory = self.shard_set.shard_dir(shard)
+            if processes:
+                conn, child_conn = Pipe()
+                process = Process(
+                    target=_shard_worker,
+                    args=(child_conn, directory, shard["doc_base"], avgdl, k1, b),
+                    daemon=True,
+                )
+                process.start()
+                child_conn.close()
+                self.workers.append((process, conn))
+            else:
+                indexer, bm25 = _open_shard(directory, avgdl, k1, b)
+                self.local_shards.append((indexer, bm25, shard["doc_base"]))
+        # Los pipes no admiten pedidos intercalados de varios hilos.
+        self._lock = threading.Lock()
+
+    def termWeights(self, query: str) -> list:
+        # (termino, peso) con todo lo que no depende del documento: idf global
+        # y frecuencia en la query.
+        n_docs = self.shard_set.doc_count
+        weights = []
+        for q_term, q_freq in self.queryProcessor.process_query(query):
+            df = self.shard_set.df(q_term)
+            if df == 0:
+                continue
+            if self.ranking == "bm25":
+                weight = self.bm25.term_weight(df, q_freq)
+            else:
+                weight = math.log(n_docs / df, 2) * (1 + math.log(q_freq, 2))
+            if weight > 0:
+                weights.append((q_term, weight))
+        return weights
+
+    def searchQuery(self, query: str, top: int = 10) -> list:
+        term_weights = self.termWeights(query)
+        if not term_weights:
+            return []
+        request = (self.ranking, term_weights, top)
+        with self._lock:
+            if self.workers:
+                for _, conn in self.workers:
+                    conn.send(request)
+                results = [conn.recv() for _, conn in self.workers]
+            else:
+                results = [
+                    score_shard(indexer, bm25, doc_base, *request)
+                    for indexer, bm25, doc_base in self.local_shards
+                ]
+        merged = heapq.merge(*results, key=lambda result: result[0], reverse=True)
+        return [
+            (docName, docID, score) for score, docID, docName in islice(merged, top)
+        ]
+
+    def getQueryRanking(self, query: str, top: int = 10) -> list:
+        docs = self.searchQuery(query, top)
+        print(f"\nTop[{top}] resultados para '{query}':")
+        for docname, docID, score in docs:
+            print(f"-- {docname} : {docID} : {score:.4f}")
+        if not docs:
+            print("-- NO DOCUMENTS FOUND")
+        print("\n\n")
+        return docs
+
+    def close(self):
+        with self._lock:
+            for process, conn in self.workers:
+                conn.send(None)
+                conn.close()
+                process.join()
+            self.workers = []
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Buscador rankeado sobre un indice particionado en shards"
+    )
+    parser.add_argument("shards_dir", type=str, help="Directorio de los shards")
+    parser.add_argument(
+        "--ranking",
+        choices=("tfidf", "bm25"),
+        default="tfidf",
+        help="Funcion de score de las consultas rankeadas",
+    )
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="Consultar los shards en este proceso, uno tras otro",
+    )
+    args = parser.parse_args()
+
+    retriever = ShardedRetriever(
+        args.shards_dir, args.ranking, processes=not args.local
+    )
+    try:
+        while True:
+            query = input("Ingrese una query (enter para salir): ")
+            if not query:
+                break
+            retriever.getQueryRanking(query)
+    finally:
+        retriever.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,21 @@
 from TP4.EJ1.indexer import Indexer
 from TP4.EJ2.queryProcessor import QueryProcessor
+from TP4.EJ2.bm25 import BM25
 from pathlib import Path
 import argparse
 import math
+import re
 import boolean
+import numpy as np
+
+
+# Operadores posicionales de la query booleana: "frase entre comillas" y
+# `a NEAR/k b` (a y b a k posiciones o menos, en cualquier orden). Antes de
+# parsear se reemplazan por simbolos _opN_, que no pueden ser terminos del
+# indice porque tienen digitos y guiones bajos. Los operandos de NEAR no
+# incluyen parentesis, para poder usarlo dentro de una expresion agrupada.
+_PHRASE_RE = re.compile(r'"([^"]*)"')
+_NEAR_RE = re.compile(r'([^\s()"]+)\s+NEAR/(\d+)\s+([^\s()"]+)', re.IGNORECASE)
 
 
 class TaatRetriever:
@@ -12,10 +24,23 @@ class TaatRetriever:
         path: Path,
         nDocsToDisc: int,
         loadIndexFromDisk: bool = False,
-        indexer=Indexer(),
+        indexer=None,
+        field_weights=None,
+        ranking="tfidf",
+        k1=1.2,
+        b=0.75,
     ):
-        self.indexer = indexer
+        # El Indexer por defecto se crea aca y no como valor por defecto del
+        # parametro, para no construirlo al importar el modulo.
+        self.indexer = indexer if indexer is not None else Indexer()
         self.queryProcessor = QueryProcessor()
+        # {campo: peso} para las consultas rankeadas, p.ej. {"title": 3.0}.
+        # Necesita un indice construido con fields=True.
+        self.field_weights = field_weights
+        # ranking="bm25" cambia el score de las consultas rankeadas por BM25.
+        if ranking not in ("tfidf", "bm25"):
+            raise ValueError(f"Ranking desconocido: {ranking}")
+        self.bm25 = BM25(self.indexer, k1, b) if ranking == "bm25" else None
 
         if not loadIndexFromDisk:
             self.indexer.index_directory(path, nDocsToDisc)
@@ -23,17 +48,27 @@ class TaatRetriever:
         self.indexer.load_index()
 
         self.algebra = boolean.BooleanAlgebra()
+        self.operators = {}
 
     def searchTerm(self, term: str) -> list:
         return self.indexer.search(term)
 
+    def searchWeightedTerm(self, term: str) -> list:
+        # Los terminos de campo de la query (title:x) se buscan tal cual; los
+        # demas, con la frecuencia ponderada por campo si hay pesos.
+        if not self.field_weights or ":" in term:
+            return self.indexer.search(term)
+        return self.indexer.search_weighted(term, self.field_weights)
+
     def searchQuery(self, query: str) -> list:
+        if self.bm25 is not None:
+            return self.searchQueryBM25(query)
         query_terms = self.queryProcessor.process_query(query)
         scores = {}
         term_results = []
 
         for q_term, q_freq in query_terms:
-            postings_list = self.indexer.search(
+            postings_list = self.searchWeightedTerm(
                 q_term
             )  # cada elemento: (docName, docID, freq)
             term_results.append((q_term, q_freq, postings_list))
@@ -63,13 +98,36 @@ class TaatRetriever:
         # Armar salida como lista de tuplas: (docID, score, docName)
         return [(docName, docID, score) for docID, (score, docName) in sorted_scores]
 
+    def searchQueryBM25(self, query: str) -> list:
+        # Termino a termino, como searchQuery(), con el peso de cada termino
+        # calculado una vez antes de recorrer sus postings.
+        query_terms = self.queryProcessor.process_query(query)
+        factors = self.bm25.doc_factors()
+        scores = {}
+
+        for q_term, q_freq in query_terms:
+            postings_list = self.searchWeightedTerm(q_term)
+            weight = self.bm25.term_weight(len(postings_list), q_freq)
+            if weight <= 0:
+                continue
+            for docName, docID, d_freq in postings_list:
+                score = self.bm25.score(weight, d_freq, factors[docID])
+                if docID in scores:
+                    scores[docID] = (scores[docID][0] + score, docName)
+                else:
+                    scores[docID] = (score, docName)
+
+        sorted_scores = sorted(scores.items(), key=lambda x: x[1][0], reverse=True)
+        return [(docName, docID, score) for docID, (score, docName) in sorted_scores]
+
     def getQueryRanking(self, query: str, top: int = 10) -> None:
 
-        if any(op in query.upper() for op in ["AND", "OR", "NOT"]):
-            expression = self.algebra.parse(query, simplify=False)
-            docs = self.analyzeBooleanExpression(expression)
+        if any(op in query.upper() for op in ["AND", "OR", "NOT", "NEAR/", '"']):
+            parsed_query, self.operators = self.extractPositionalOperators(query)
+            expression = self.algebra.parse(parsed_query, simplify=False)
+            docs = sorted(self.analyzeBooleanExpression(expression), key=lambda d: d[1])
             print(f"\nDocumentos recuperados para '{query}':")
-            for docname, docID, _ in docs:
+            for docname, docID in docs:
                 print(f"-- {docname} : {docID}")
 
         else:
@@ -84,10 +142,115 @@ class TaatRetriever:
         print("\n\n")
         return docs
 
+    def extractPositionalOperators(self, query: str):
+        # Devuelve la query con las frases y los NEAR/k reemplazados por
+        # simbolos, y {simbolo: operador}. Un operando de NEAR puede ser un
+        # termino, una frase o, encadenando, otro NEAR.
+        operators = {}
+
+        def add(operator):
+            symbol = f"_op{len(operators)}_"
+            operators[symbol] = operator
+            return symbol
+
+        query = _PHRASE_RE.sub(lambda m: add(("phrase", m.group(1))), query)
+        while True:
+            match = _NEAR_RE.search(query)
+            if match is None:
+                break
+            left, distance, right = match.groups()
+            symbol = add(("near", int(distance), left, right))
+            query = query[: match.start()] + symbol + query[match.end() :]
+        return query, operators
+
+    def _operand(self, operand):
+        if operand in self.operators:
+            return self.operators[operand]
+        return ("phrase", operand)
+
+    def _operator_terms(self, operator):
+        if operator[0] == "phrase":
+            return [term for term, _ in self.queryProcessor.process_phrase(operator[1])]
+        _, _, left, right = operator
+        return self._operator_terms(self._operand(left)) + self._operator_terms(
+            self._operand(right)
+        )
+
+    def _match_positions(self, operator, doc_ids):
+        # Para cada doc de doc_ids, las posiciones donde empieza una ocurrencia
+        # del operador. Solo se leen posiciones de estos documentos.
+        if operator[0] == "phrase":
+            phrase = self.queryProcessor.process_phrase(operator[1])
+            if not phrase:
+                return [np.empty(0, dtype=np.int64) for _ in doc_ids]
+            term, offset = phrase[0]
+            matches = [
+                positions - offset
+                for positions in self.indexer.get_positions(term, doc_ids)
+            ]
+            for term, offset in phrase[1:]:
+                term_positions = self.indexer.get_positions(term, doc_ids)
+                matches = [
+                    np.intersect1d(starts, positions - offset)
+                    for starts, positions in zip(matches, term_positions)
+                ]
+            return matches
+
+        _, distance, left, right = operator
+        left_matches = self._match_positions(self._operand(left), doc_ids)
+        right_matches = self._match_positions(self._operand(right), doc_ids)
+        matches = []
+        for left_positions, right_positions in zip(left_matches, right_matches):
+            # Para cada posicion de la izquierda, si hay alguna de la derecha en
+            # [pos - k, pos + k].
+            low = np.searchsorted(right_positions, left_positions - distance)
+            high = np.searchsorted(right_positions, left_positions + distance, "right")
+            matches.append(left_positions[high > low])
+        return matches
+
+    def positionalOperatorDocs(self, operator):
+        # Primero la interseccion por docID de todos los terminos del operador
+        # (de la lista mas corta a la mas larga); las posiciones se revisan solo
+        # para los documentos que quedan.
+        terms = self._operator_terms(operator)
+        if not terms:
+            return set()
+        by_df = sorted(
+            set(terms), key=lambda term: len(self.indexer.get_postings(term)[0])
+        )
+        postings = [self.indexer.get_postings(term)[0] for term in by_df]
+        candidates = postings[0]
+        for doc_ids in postings[1:]:
+            if len(candidates) == 0:
+                break
+            candidates = np.intersect1d(candidates, doc_ids, assume_unique=True)
+        if len(candidates) == 0:
+            return set()
+
+        if getattr(self.indexer, "positions", None) is None:
+            print("[WARN]: El indice no tiene posiciones; se usa AND entre terminos.")
+            matched = candidates
+        else:
+            matches = self._match_positions(operator, candidates)
+            matched = candidates[[len(m) > 0 for m in matches]]
+
+        matched = set(matched.tolist())
+        return {
+            (docname, docID)
+            for docname, docID, _ in self.indexer.search(by_df[0])
+            if docID in matched
+        }
+
     def analyzeBooleanExpression(self, expression):
         if isinstance(expression, boolean.boolean.Symbol):
-            # Devuelve lista de tuplas (docname, docid)
-            return set(self.indexer.search(str(expression)))
+            if str(expression) in self.operators:
+                return self.positionalOperatorDocs(self.operators[str(expression)])
+            # Devuelve set de tuplas (docname, docid), sin la frecuencia, para
+            # poder operar con el resultado de NOT.
+            return {
+                (docname, docID)
+                for docname, docID, _ in self.indexer.search(str(expression))
+            }
 
         elif isinstance(expression, boolean.boolean.NOT):
             # all_docs y term_docs son sets de tuplas (docname, docid)
@@ -128,9 +291,36 @@ def main():
         action="store_true",
         help="Cargar índice desde disco en lugar de indexar de nuevo",
     )
+    parser.add_argument(
+        "--fields",
+        action="store_true",
+        help="Indexar titulo y encabezados como campos y ponderarlos al rankear",
+    )
+    parser.add_argument("--title-weight", type=float, default=3.0)
+    parser.add_argument("--heading-weight", type=float, default=2.0)
+    parser.add_argument(
+        "--ranking",
+        choices=("tfidf", "bm25"),
+        default="tfidf",
+        help="Funcion de score de las consultas rankeadas",
+    )
+    parser.add_argument("--k1", type=float, default=1.2, help="k1 de BM25")
+    parser.add_argument("--b", type=float, default=0.75, help="b de BM25")
     args = parser.parse_args()
+    field_weights = None
+    if args.fields:
+        field_weights = {"title": args.title_weight, "heading": args.heading_weight}
 
-    taat = TaatRetriever(Path(args.path), args.docs, loadIndexFromDisk=args.load)
+    taat = TaatRetriever(
+        Path(args.path),
+        args.docs,
+        loadIndexFromDisk=args.load,
+        indexer=Indexer(fields=args.fields),
+        field_weights=field_weights,
+        ranking=args.ranking,
+        k1=args.k1,
+        b=args.b,
+    )
 
     while True:
         query = input("Ingrese una query: ")
@@ -1,8 +1,10 @@
 from TP4.EJ1.indexer import Indexer
 from TP4.EJ2.queryProcessor import QueryProcessor
+from TP4.EJ2.bm25 import BM25
 from pathlib import Path
 import argparse
 import math
+import heapq
 import boolean
 
 
@@ -12,10 +14,21 @@ class DaatRetriever:
         path: Path,
         nDocsToDisc: int,
         loadIndexFromDisk: bool = False,
-        indexer=Indexer(True),
+        indexer=None,
+        field_weights=None,
+        ranking="tfidf",
+        k1=1.2,
+        b=0.75,
     ):
-        self.indexer = indexer
+        self.indexer = indexer if indexer is not None else Indexer(True)
         self.queryProcessor = QueryProcessor()
+        # {campo: peso} para las consultas rankeadas, p.ej. {"title": 3.0}.
+        # Necesita un indice construido con fields=True.
+        self.field_weights = field_weights
+        # ranking="bm25" cambia el score de las consultas rankeadas por BM25.
+        if ranking not in ("tfidf", "bm25"):
+            raise ValueError(f"Ranking desconocido: {ranking}")
+        self.bm25 = BM25(self.indexer, k1, b) if ranking == "bm25" else None
 
         if not loadIndexFromDisk:
             self.indexer.index_directory(path, nDocsToDisc)
@@ -27,6 +40,13 @@ class DaatRetriever:
     def searchTerm(self, term: str) -> list:
         return self.indexer.search(term)
 
+    def searchWeightedTerm(self, term: str) -> list:
+        # Los terminos de campo de la query (title:x) se buscan tal cual; los
+        # demas, con la frecuencia ponderada por campo si hay pesos.
+        if not self.field_weights or ":" in term:
+            return self.indexer.search(term)
+        return self.indexer.search_weighted(term, self.field_weights)
+
     def get_by_docID(self, postingList, x, term):
         left = 0
         right = len(postingList) - 1
@@ -45,13 +65,15 @@ class DaatRetriever:
         return None
 
     def searchQuery(self, query: str) -> list:
+        if self.bm25 is not None:
+            return self.searchQueryBM25(query)
         query_terms = self.queryProcessor.process_query(query)
 
         scores = {}
         term_results = []
 
         for q_term, q_freq in query_terms:
-            postings_list = self.indexer.search(q_term)
+            postings_list = self.searchWeightedTerm(q_term)
             term_results.append((q_term, q_freq, postings_list))
 
         aux = self.indexer.getAllDocsID()
@@ -87,7 +109,7 @@ class DaatRetriever:
 
         if query_norm > 0:
             for docID in scores:
-                doc_norm = docNorms[docID]
+                doc_norm = float(docNorms[docID])
 
                 if doc_norm > 0:
                     scores[docID] = (
@@ -99,6 +121,39 @@ class DaatRetriever:
 
         return [(docName, docID, score) for docID, (score, docName) in sorted_scores]
 
+    def searchQueryBM25(self, query: str) -> list:
+        # Documento a documento: se avanza a la vez sobre las postings de todos
+        # los terminos (ordenadas por docID) y cada documento se puntua completo
+        # antes de pasar al siguiente. Los pesos por termino se calculan una
+        # vez por query.
+        query_terms = self.queryProcessor.process_query(query)
+        factors = self.bm25.doc_factors()
+        cursors = []
+        for q_term, q_freq in query_terms:
+            postings_list = self.searchWeightedTerm(q_term)
+            weight = self.bm25.term_weight(len(postings_list), q_freq)
+            if weight > 0:
+                cursors.append((postings_list, weight))
+
+        heap = [(postings[0][1], i, 0) for i, (postings, _) in enumerate(cursors)]
+        heapq.heapify(heap)
+        results = []
+        while heap:
+            docID = heap[0][0]
+            score = 0.0
+            docName = None
+            while heap and heap[0][0] == docID:
+                _, i, position = heapq.heappop(heap)
+                postings, weight = cursors[i]
+                docName, _, d_freq = postings[position]
+                score += self.bm25.score(weight, d_freq, factors[docID])
+                if position + 1 < len(postings):
+                    heapq.heappush(heap, (postings[position + 1][1], i, position + 1))
+            results.append((docName, docID, score))
+
+        results.sort(key=lambda x: x[2], reverse=True)
+        return results
+
     def compute_query_norm(
         self, term_results: list, total_docs: int
     ) -> tuple[float, dict]:
@@ -120,9 +175,9 @@ class DaatRetriever:
 
         if any(op in query.upper() for op in ["AND", "OR", "NOT"]):
             expression = self.algebra.parse(query, simplify=False)
-            docs = self.analyzeBooleanExpression(expression)
+            docs = sorted(self.analyzeBooleanExpression(expression), key=lambda d: d[1])
             print(f"\nDocumentos recuperados para '{query}':")
-            for docname, docID, _ in docs:
+            for docname, docID in docs:
                 print(f"-- {docname} : {docID}")
 
         else:
@@ -139,8 +194,12 @@ class DaatRetriever:
 
     def analyzeBooleanExpression(self, expression):
         if isinstance(expression, boolean.boolean.Symbol):
-            # Devuelve lista de tuplas (docname, docid)
-            return set(self.indexer.search(str(expression)))
+            # Devuelve set de tuplas (docname, docid), sin la frecuencia, para
+            # poder operar con el resultado de NOT.
+            return {
+                (docname, docID)
+                for docname, docID, _ in self.indexer.search(str(expression))
+            }
 
         elif isinstance(expression, boolean.boolean.NOT):
             # all_docs y term_docs son sets de tuplas (docname, docid)
@@ -181,10 +240,35 @@ def main():
         action="store_true",
         help="Cargar índice desde disco en lugar de indexar de nuevo",
     )
+    parser.add_argument(
+        "--fields",
+        action="store_true",
+        help="Indexar titulo y encabezados como campos y ponderarlos al rankear",
+    )
+    parser.add_argument("--title-weight", type=float, default=3.0)
+    parser.add_argument("--heading-weight", type=float, default=2.0)
+    parser.add_argument(
+        "--ranking",
+        choices=("tfidf", "bm25"),
+        default="tfidf",
+        help="Funcion de score de las consultas rankeadas",
+    )
+    parser.add_argument("--k1", type=float, default=1.2, help="k1 de BM25")
+    parser.add_argument("--b", type=float, default=0.75, help="b de BM25")
     args = parser.parse_args()
+    field_weights = None
+    if args.fields:
+        field_weights = {"title": args.title_weight, "heading": args.heading_weight}
 
     daat = DaatRetriever(
-        Path(args.path), args.docs, loadIndexFromDisk=args.load, indexer=Indexer(True)
+        Path(args.path),
+        args.docs,
+        loadIndexFromDisk=args.load,
+        indexer=Indexer(True, fields=args.fields),
+        field_weights=field_weights,
+        ranking=args.ranking,
+        k1=args.k1,
+        b=args.b,
     )
 
     while True:
@@ -1,16 +1,24 @@
-import time
-from bs4 import BeautifulSoup
 from pathlib import Path
 from collections import defaultdict
-import struct
+import numpy as np
+from array import array
 import pickle
 import os
 from TP4.EJ1.tokenicer import TextProcessor
+from TP4.EJ1.extractors import get_extractor
+from TP4.EJ1.runs import merge_chunks, write_chunk, EMPTY_POSTINGS
+from TP4.EJ1.postings import PostingsReader
+from TP4.EJ1.termdict import TermDictionary, write_term_dictionary
+
+
+# Formato de postings.bin con skips: registros (doc_id, freq, skip_to).
+SKIP_POSTING_DTYPE = np.dtype([("doc_id", "u4"), ("freq", "u4"), ("skip_to", "u4")])
 
 
 class IndexerSkiplist:
-    def __init__(self):
+    def __init__(self, extractor="auto"):
         self.text_processor = TextProcessor()
+        self.extractor = get_extractor(extractor)
         self.terms = []
         self.term_ids = {}
         self.json_data = defaultdict(lambda: {"postings": {}})
@@ -19,10 +27,12 @@ class IndexerSkiplist:
         self.epoch = 0
         self.PATH_CHUNKS = Path("chunks") / "chunk"
         self.PATH_VOCAB = "vocabulary.bin"
+        self.PATH_VOCAB_INDEX = "vocabulary_index.bin"
         self.PATH_POSTINGS = "postings.bin"
         self.PATH_DOCNAMES = "docnames.bin"
         self.docnames = {}
         self.index = {}
+        self.postings = None
         self.doc_count = 0
 
     def getAllDocsID(self):
@@ -32,7 +42,7 @@ class IndexerSkiplist:
         return result
 
     def _add_document(self, doc_id, text, docname):
-        term_freqs = self.text_processor.process(text)
+        term_freqs = self.text_processor.count(text)
         for term, freq in term_freqs.items():
             if term not in self.term_ids:
                 term_id = len(self.terms)
@@ -52,10 +62,15 @@ class IndexerSkiplist:
 
         print(f" ----- [Serializando chunk {self.epoch}]")
 
-        with open(chunk_file, "wb") as f:
-            for term_id, data in sorted(self.json_data.items()):
-                for doc_id, freq in data["postings"].items():
-                    f.write(struct.pack("III", term_id, int(doc_id), freq))
+        term_ids = array("I")
+        doc_ids = array("I")
+        freqs = array("I")
+        for term_id, data in self.json_data.items():
+            postings = data["postings"]
+            term_ids.extend(array("I", [term_id]) * len(postings))
+            doc_ids.extend(map(int, postings.keys()))
+            freqs.extend(postings.values())
+        write_chunk(chunk_file, term_ids, doc_ids, freqs)
 
         self.json_data.clear()
         self.epoch += 1
@@ -66,12 +81,7 @@ class IndexerSkiplist:
 
         for file in path.rglob("*"):
             if file.is_file():
-                with open(file, encoding="utf-8") as f:
-                    html = f.read()
-                soup = BeautifulSoup(html, "html.parser")
-                for tag in soup(["script", "style"]):
-                    tag.extract()
-                text = soup.get_text()
+                text = self.extractor.extract_file(file)
                 self._add_document(str(self.file_index), text, file.stem)
                 self.file_index += 1
                 self.n_iterations += 1
@@ -91,44 +101,37 @@ class IndexerSkiplist:
 
         offset = 0
         vocab = {}
-        postings_dict = defaultdict(list)
-
-        start_time = time.time()
-        for epoch in range(self.epoch):
-            chunk_file = self.PATH_CHUNKS.parent / f"{self.PATH_CHUNKS.stem}{epoch}.bin"
-            with open(chunk_file, "rb") as c_file:
-                while True:
-                    data = c_file.read(12)
-                    if not data:
-                        break
-                    term_id, doc_id, freq = struct.unpack("III", data)
-                    postings_dict[term_id].append((doc_id, freq))
 
-        print(f" Tiempo de merge: {time.time() - start_time:.2f} s.")
+        chunk_files = [
+            self.PATH_CHUNKS.parent / f"{self.PATH_CHUNKS.stem}{epoch}.bin"
+            for epoch in range(self.epoch)
+        ]
+        merged = merge_chunks(chunk_files)
+        next_term = next(merged, None)
 
         total_terms = len(self.terms)
         step = max(1, total_terms // 10)
 
-        with open(self.PATH_VOCAB, "wb") as v_file, open(
-            self.PATH_POSTINGS, "wb"
-        ) as p_file:
+        with open(self.PATH_POSTINGS, "wb") as p_file:
             for term_id, term in enumerate(self.terms):
-                postings = postings_dict.get(term_id, [])
-                postings.sort()
+                if next_term is not None and next_term[0] == term_id:
+                    _, doc_ids, freqs = next_term
+                    next_term = next(merged, None)
+                else:
+                    doc_ids, freqs = EMPTY_POSTINGS
 
-                df = len(postings)
+                df = len(doc_ids)
                 skip_interval = int(df**0.5) if df > 0 else 0
 
-                for i, (doc_id, freq) in enumerate(postings):
-                    if (
-                        skip_interval > 0
-                        and i % skip_interval == 0
-                        and i + skip_interval < df
-                    ):
-                        skip_to = i + skip_interval
-                    else:
-                        skip_to = 0
-                    p_file.write(struct.pack("III", doc_id, freq, skip_to))
+                # skip_to = i + skip_interval cada skip_interval postings, si el
+                # salto cae dentro de la lista; 0 en el resto.
+                records = np.zeros(df, dtype=SKIP_POSTING_DTYPE)
+                records["doc_id"] = doc_ids
+                records["freq"] = freqs
+                if skip_interval > 0:
+                    starts = np.arange(0, df - skip_interval, skip_interval)
+                    records["skip_to"][starts] = starts + skip_interval
+                records.tofile(p_file)
 
                 vocab[term] = (offset, df)
                 offset += df * 12  # 3 * 4 bytes (doc_id, freq, skip_to)
@@ -137,19 +140,19 @@ class IndexerSkiplist:
                     percent = ((term_id + 1) * 100) // total_terms
                     print(f" --- {percent}% de los términos almacenados.")
 
-            pickle.dump(vocab, v_file)
-            print(f"[DEBUG] Guardado vocabulario con {len(vocab)} términos.")
+        write_term_dictionary(self.PATH_VOCAB, self.PATH_VOCAB_INDEX, vocab)
+        print(f"[DEBUG] Guardado vocabulario con {len(vocab)} términos.")
 
         with open(self.PATH_DOCNAMES, "wb") as d_file:
             pickle.dump(self.docnames, d_file)
 
     def load_index(self):
         print(f"\nCargando indice desde el archivo a la memora.\n")
-        if not os.path.exists(self.PATH_VOCAB):
+        if not os.path.exists(self.PATH_VOCAB_INDEX):
             print("[ERROR]: Vocabulario no encontrado.")
             return
-        with open(self.PATH_VOCAB, "rb") as v_file:
-            self.index = pickle.load(v_file)
+        self.index = TermDictionary(self.PATH_VOCAB, self.PATH_VOCAB_INDEX)
+        self.postings = PostingsReader(self.PATH_POSTINGS, SKIP_POSTING_DTYPE)
         if not os.path.exists(self.PATH_DOCNAMES):
             print("[ERROR]: DOCNAMES no encontrados.")
             return
@@ -160,13 +163,12 @@ class IndexerSkiplist:
         if term not in self.index:
             return []
         offset, df = self.index[term]
-        postings = []
-        with open(self.PATH_POSTINGS, "rb") as p_file:
-            p_file.seek(offset)
-            for _ in range(df):
-                doc_id, freq, skip_to = struct.unpack("III", p_file.read(12))
-                postings.append((self.docnames[str(doc_id)], doc_id, freq, skip_to))
-        return postings
+        records = self.postings.records(offset, df)
+        docnames = self.docnames
+        return [
+            (docnames[str(doc_id)], doc_id, freq, skip_to)
+            for doc_id, freq, skip_to in records.tolist()
+        ]
 
     def getSkipList(self, term):
         postings = self.search(term)
@@ -1,9 +1,9 @@
-import os
-from TP4.EJ1.indexer import Indexer
+from TP4.EJ1.indexer import Indexer, DocStatsAccumulator
+from TP4.EJ1.runs import write_postings
+from TP4.EJ1.termdict import write_term_dictionary
 from collections import defaultdict
 from pathlib import Path
-import struct
-import pickle
+import numpy as np
 
 
 class IndexerEJ6(Indexer):
@@ -39,68 +39,46 @@ class IndexerEJ6(Indexer):
 
         self.doc_count = len(docnames)
         vocab = {}
+        stats = DocStatsAccumulator(max(docnames, default=-1) + 1, self.doc_count)
         total_terms = len(self.terms)
         step = max(1, total_terms // 10)
 
-        with open(self.PATH_VOCAB, "wb") as v_file, open(
-            self.PATH_POSTINGS, "wb"
-        ) as p_file:
+        self._begin_generation()
+        with open(self.PATH_POSTINGS, "wb") as p_file:
             offset = 0
             for term_id, term in enumerate(self.terms):
 
                 df, postings = postings_dict[term]
 
-                postings.sort()  # Ordenar por doc_id
+                doc_ids = np.sort(np.array(postings, dtype="u4"))  # Ordenar por doc_id
+                freqs = np.ones(len(doc_ids), dtype="u4")  # Asumo freq = 1
 
-                for doc_id in postings:
-                    p_file.write(struct.pack("II", doc_id, 1))  # Asumo freq = 1
                 vocab[term] = (offset, df)
-                offset += df * 8
+                offset += write_postings(p_file, doc_ids, freqs)
+                stats.add_term(doc_ids, freqs)
 
                 if (term_id + 1) % step == 0:
                     percent = ((term_id + 1) * 100) // total_terms
                     print(f" --- {percent}% de los términos almacenados.")
 
-            pickle.dump(vocab, v_file)
-            print(f"[DEBUG] Guardado vocabulario con {len(vocab)} términos.")
+        write_term_dictionary(self.PATH_VOCAB, self.PATH_VOCAB_INDEX, vocab)
+        print(f"[DEBUG] Guardado vocabulario con {len(vocab)} términos.")
 
-        self.docnames = docnames
         self.doc_count = len(docnames)
         if self.doc_count == 0:
             self.doc_count = 1
 
-        with open(self.PATH_DOCNAMES, "wb") as d_file:
-            pickle.dump(self.docnames, d_file)
+        stats.save(self.PATH_DOC_NORMS, self.PATH_DOC_LENGTHS)
+
+        # Los documentos de EJ6 no tienen nombre: se guarda el doc_id como texto.
+        self.docnames = {doc_id: str(doc_id) for doc_id in docnames}
+        self.save_docnames()
+        self._commit_generation()
 
     def load_index(self):
-        print(f"\nCargando indice desde el archivo a la memora.\n")
-        if not os.path.exists(self.PATH_VOCAB):
-            print("[ERROR]: Vocabulario no encontrado.")
-            return
-        with open(self.PATH_VOCAB, "rb") as v_file:
-            self.index = pickle.load(v_file)
-        if not os.path.exists(self.PATH_DOCNAMES):
-            print("[ERROR]: DOCNAMES no encontrados.")
-            return
-        with open(self.PATH_DOCNAMES, "rb") as d_file:
-            self.docnames = pickle.load(d_file)
-        if self.saveNorms:
-            self.doc_count = len(self.docnames)
-            self.saveDocNorms()
+        super().load_index()
+        self.doc_count = max(1, self.doc_count)
 
     def build_vocabulary(self):
         pass
 
-    def search(self, term):
-        if term not in self.index:
-            return []
-        offset, df = self.index[term]
-        postings = []
-        with open(self.PATH_POSTINGS, "rb") as p_file, open(
-            self.PATH_DOCNAMES, "rb"
-        ) as d_file:
-            p_file.seek(offset)
-            for _ in range(df):
-                doc_id, freq = struct.unpack("II", p_file.read(8))
-                postings.append((str(doc_id), doc_id, freq))
-        return postings
@@ -1,17 +1,20 @@
-from bs4 import BeautifulSoup
 from pathlib import Path
 from collections import defaultdict
 import struct
+from array import array
 import pickle
 import time
 import os
 from bitarray import bitarray
 from TP4.EJ1.tokenicer import TextProcessor
+from TP4.EJ1.extractors import get_extractor
+from TP4.EJ1.runs import merge_chunks, write_chunk, EMPTY_POSTINGS
 
 
 class Indexer:
-    def __init__(self, useDgaps=False):
+    def __init__(self, useDgaps=False, extractor="auto"):
         self.text_processor = TextProcessor()
+        self.extractor = get_extractor(extractor)
         self.terms = []
         self.term_ids = {}
         self.json_data = defaultdict(lambda: {"postings": {}})
@@ -36,7 +39,7 @@ class Indexer:
         return result
 
     def _add_document(self, doc_id, text, docname):
-        term_freqs = self.text_processor.process(text)
+        term_freqs = self.text_processor.count(text)
         for term, freq in term_freqs.items():
             if term not in self.term_ids:
                 term_id = len(self.terms)
@@ -53,10 +56,15 @@ class Indexer:
         )
         chunk_file.parent.mkdir(parents=True, exist_ok=True)
 
-        with open(chunk_file, "wb") as f:
-            for term_id, data in sorted(self.json_data.items()):
-                for doc_id, freq in data["postings"].items():
-                    f.write(struct.pack("III", term_id, int(doc_id), freq))
+        term_ids = array("I")
+        doc_ids = array("I")
+        freqs = array("I")
+        for term_id, data in self.json_data.items():
+            postings = data["postings"]
+            term_ids.extend(array("I", [term_id]) * len(postings))
+            doc_ids.extend(map(int, postings.keys()))
+            freqs.extend(postings.values())
+        write_chunk(chunk_file, term_ids, doc_ids, freqs)
 
         self.json_data.clear()
         self.epoch += 1
@@ -71,12 +79,7 @@ class Indexer:
 
         for file in path.rglob("*"):
             if file.is_file():
-                with open(file, encoding="utf-8") as f:
-                    html = f.read()
-                soup = BeautifulSoup(html, "html.parser")
-                for tag in soup(["script", "style"]):
-                    tag.extract()
-                text = soup.get_text()
+                text = self.extractor.extract_file(file)
                 self._add_document(str(self.file_index), text, file.stem)
                 self.file_index += 1
                 self.n_iterations += 1
@@ -97,22 +100,13 @@ class Indexer:
         offset_docIds = 0
         offset_freqs = 0
         vocab = {}
-        postings_dict = defaultdict(list)
-
-        # Aca leo todos los chunks UNA SOLA VEZ y agrupo por term_id
-        # Realmente, esto trae el indice entero a memoria, venciendo el sentido de los chunks,
-        # pero por cuestiones de tiempo de ejecucion decidi hacerlo de esta manera.
-        # (Caso contrario, hubiera recorrido cada chunk en busqueda de un term_id especifico, guardar su posting list,
-        # y pasar al siguiente termino).
-        for epoch in range(self.epoch):
-            chunk_file = self.PATH_CHUNKS.parent / f"{self.PATH_CHUNKS.stem}{epoch}.bin"
-            with open(chunk_file, "rb") as c_file:
-                while True:
-                    data = c_file.read(12)
-                    if not data:
-                        break
-                    term_id, doc_id, freq = struct.unpack("III", data)
-                    postings_dict[term_id].append((doc_id, freq))
+
+        chunk_files = [
+            self.PATH_CHUNKS.parent / f"{self.PATH_CHUNKS.stem}{epoch}.bin"
+            for epoch in range(self.epoch)
+        ]
+        merged = merge_chunks(chunk_files)
+        next_term = next(merged, None)
 
         total_terms = len(self.terms)
         step = max(1, total_terms // 10)
@@ -125,8 +119,12 @@ class Indexer:
             time_accum = 0
 
             for term_id, term in enumerate(self.terms):
-                postings = postings_dict.get(term_id, [])
-                postings.sort()  # Ordenar por doc_id
+                if next_term is not None and next_term[0] == term_id:
+                    _, doc_ids, freqs = next_term
+                    next_term = next(merged, None)
+                else:
+                    doc_ids, freqs = EMPTY_POSTINGS
+                postings = list(zip(doc_ids.tolist(), freqs.tolist()))
 
                 if self.useDgaps:
                     save_list = self.getDGaps(postings)
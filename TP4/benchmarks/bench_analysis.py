@@ -0,0 +1,77 @@
+import argparse
+import random
+import time
+from pathlib import Path
+from bs4 import BeautifulSoup
+from TP4.EJ1.tokenicer import TextProcessor, tokenize
+
+
+def load_texts(path: Path, max_docs: int) -> list:
+    texts = []
+    for file in sorted(path.rglob("*")):
+        if not file.is_file():
+            continue
+        with open(file, encoding="utf-8") as f:
+            soup = BeautifulSoup(f.read(), "html.parser")
+        for tag in soup(["script", "style"]):
+            tag.extract()
+        texts.append(soup.get_text())
+        if len(texts) >= max_docs:
+            break
+    return texts
+
+
+def synthetic_texts(n_docs: int, words_per_doc: int) -> list:
+    # Vocabulario con distribucion aproximadamente Zipf, como en un corpus real.
+    rng = random.Random(42)
+    vocab = [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 12)))
+        for _ in range(20000)
+    ]
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]
+    return [
+        " ".join(rng.choices(vocab, weights, k=words_per_doc)) for _ in range(n_docs)
+    ]
+
+
+def bench(name, fn, texts, n_tokens, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    print(f" -- {name:<10} {best:.3f} s. ({n_tokens / best:,.0f} tokens/s)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compara el analisis por ordenamiento contra el analisis por conteo"
+    )
+    parser.add_argument(
+        "path", type=str, nargs="?", help="Directorio con documentos HTML"
+    )
+    parser.add_argument("--docs", type=int, default=200, help="Cantidad de documentos")
+    parser.add_argument(
+        "--words", type=int, default=50000, help="Palabras por documento sintetico"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.path:
+        texts = load_texts(Path(args.path), args.docs)
+    else:
+        texts = synthetic_texts(args.docs, args.words)
+
+    processor = TextProcessor()
+    n_tokens = sum(len(tokenize(text)) for text in texts)
+    print(f"\n{len(texts)} documentos, {n_tokens} tokens.\n")
+
+    sort_time = bench("sort", processor.process, texts, n_tokens, args.repeat)
+    count_time = bench("count", processor.count, texts, n_tokens, args.repeat)
+    print(f"\nSpeedup: {sort_time / count_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import struct
+import tempfile
+import time
+import numpy as np
+from TP4.EJ1.runs import CHUNK_DTYPE, merge_chunks, write_chunk
+
+
+# Version anterior: un struct.pack/unpack y un write/read por posting.
+def write_struct(path, term_ids, doc_ids, freqs):
+    with open(path, "wb") as f:
+        for term_id, doc_id, freq in zip(term_ids, doc_ids, freqs):
+            f.write(struct.pack("III", term_id, doc_id, freq))
+
+
+def read_struct(path):
+    postings = []
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(12)
+            if not data:
+                break
+            postings.append(struct.unpack("III", data))
+    return postings
+
+
+def write_raw_chunk(path, term_ids, doc_ids, freqs):
+    # Registros de 12 bytes, el mismo formato que la version con struct.
+    write_chunk(path, term_ids, doc_ids, freqs, compress=False)
+
+
+def read_numpy(path):
+    return sum(len(doc_ids) for _, doc_ids, _ in merge_chunks([path]))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compara la E/S de chunks con struct contra NumPy (MB/s)"
+    )
+    parser.add_argument("--postings", type=int, default=2_000_000)
+    parser.add_argument("--terms", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    term_ids = rng.integers(0, args.terms, args.postings, dtype="u4")
+    doc_ids = np.arange(args.postings, dtype="u4")
+    freqs = rng.integers(1, 20, args.postings, dtype="u4")
+    # Ambas versiones reciben las columnas ya ordenadas, para medir solo la E/S.
+    order = np.lexsort((doc_ids, term_ids))
+    term_ids, doc_ids, freqs = term_ids[order], doc_ids[order], freqs[order]
+    sorted_cols = [col.tolist() for col in (term_ids, doc_ids, freqs)]
+    size_mb = args.postings * CHUNK_DTYPE.itemsize / 2**20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chunk0.bin")
+        results = {
+            "escritura struct": timed(write_struct, path, *sorted_cols),
+            "lectura struct": timed(read_struct, path),
+            "escritura numpy": timed(write_raw_chunk, path, term_ids, doc_ids, freqs),
+            "lectura numpy": timed(read_numpy, path),
+        }
+
+    print(f"\n{args.postings} postings ({size_mb:.1f} MB).\n")
+    for name, elapsed in results.items():
+        print(f" -- {name:<17} {elapsed:.3f} s. ({size_mb / elapsed:.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import contextlib
+import filecmp
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+from TP4.EJ1.indexer import Indexer
+from TP4.EJ1.runs import merge_chunks
+
+
+# Indexa el mismo corpus con chunks sin comprimir (registros de 12 bytes) y
+# comprimidos (agrupados por termino, con varints), y compara el espacio de
+# chunks/ y el tiempo del merge.
+
+
+def build(path, index_dir, compress, docs_per_chunk, workers):
+    indexer = Indexer(index_dir=index_dir)
+    indexer.compress_chunks = compress
+    # El Indexer informa cada paso por stdout; aca solo interesan los tiempos.
+    with contextlib.redirect_stdout(io.StringIO()):
+        indexer.index_directory(path, docs_per_chunk, workers)
+    return indexer
+
+
+def drop_caches():
+    # Vacia el page cache de Linux (requiere root) para medir el merge leyendo
+    # los chunks desde el disco, como con un corpus que no entra en memoria.
+    os.sync()
+    with open("/proc/sys/vm/drop_caches", "w") as f:
+        f.write("1")
+
+
+def time_merge(chunk_files, repeat, cold):
+    best = float("inf")
+    for _ in range(repeat):
+        if cold:
+            drop_caches()
+        start = time.perf_counter()
+        for _ in merge_chunks(chunk_files):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compara chunks sin comprimir contra chunks comprimidos"
+    )
+    parser.add_argument("path", type=str, help="Directorio con documentos HTML")
+    parser.add_argument("--docs", type=int, default=250, help="Documentos por chunk")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--cold",
+        action="store_true",
+        help="Vaciar el page cache antes de cada merge (Linux, requiere root)",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, compress in (("sin comprimir", False), ("comprimidos", True)):
+            index_dir = os.path.join(tmp, name.replace(" ", "_"))
+            indexer = build(
+                Path(args.path), index_dir, compress, args.docs, args.workers
+            )
+            chunk_files = indexer._chunk_files()
+            size = sum(os.path.getsize(path) for path in chunk_files)
+            merge_time = time_merge(chunk_files, args.repeat, args.cold)
+            if args.cold:
+                drop_caches()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                indexer.build_vocabulary()
+            build_time = time.perf_counter() - start
+            results[name] = (size, merge_time, build_time, indexer.PATH_POSTINGS)
+            n_postings = indexer.n_postings
+
+        same = filecmp.cmp(
+            results["sin comprimir"][3], results["comprimidos"][3], shallow=False
+        )
+
+    print(f"\n{n_postings} postings, postings.bin iguales: {same}.\n")
+    for name, (size, merge_time, build_time, _) in results.items():
+        print(
+            f" -- {name:<14} chunks: {size / 2**20:7.1f} MB "
+            f"({size / n_postings:.2f} bytes por posting), "
+            f"merge: {merge_time:.3f} s., build_vocabulary: {build_time:.3f} s."
+        )
+    raw, packed = results["sin comprimir"], results["comprimidos"]
+    print(
+        f"\nEspacio: {raw[0] / packed[0]:.2f}x menos, "
+        f"merge: {raw[1] / packed[1]:.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import time
+from collections import Counter
+from pathlib import Path
+from TP4.EJ1.extractors import EXTRACTORS, get_extractor
+from TP4.EJ1.tokenicer import tokenize
+
+# Las paginas XHTML suelen empezar con esta declaracion; cada documento se
+# vuelve a extraer con ella adelante para comprobar que no cambia los terminos.
+XML_PROLOG = '<?xml version="1.0" encoding="utf-8"?>\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compara los extractores de texto HTML (docs/s y paridad de terminos)"
+    )
+    parser.add_argument("path", type=str, help="Directorio con documentos HTML")
+    parser.add_argument("--docs", type=int, default=1000, help="Maximo de documentos")
+    args = parser.parse_args()
+
+    files = [f for f in sorted(Path(args.path).rglob("*")) if f.is_file()][: args.docs]
+    htmls = []
+    for file in files:
+        with open(file, encoding="utf-8") as f:
+            htmls.append(f.read())
+    size_mb = sum(len(html) for html in htmls) / 2**20
+    print(f"\n{len(htmls)} documentos, {size_mb:.1f} MB.\n")
+
+    # La referencia de paridad es el extractor original basado en BeautifulSoup.
+    reference = None
+    for name in EXTRACTORS:
+        try:
+            extractor = get_extractor(name)
+        except ImportError:
+            print(f" -- {name:<8} no disponible")
+            continue
+
+        start = time.perf_counter()
+        texts = [extractor.extract(html) for html in htmls]
+        elapsed = time.perf_counter() - start
+
+        terms = [Counter(tokenize(text)) for text in texts]
+        if reference is None:
+            reference = terms
+        mismatches = sum(1 for a, b in zip(reference, terms) if a != b)
+        prolog_terms = [
+            Counter(tokenize(extractor.extract(XML_PROLOG + html))) for html in htmls
+        ]
+        prolog_mismatches = sum(1 for a, b in zip(reference, prolog_terms) if a != b)
+        print(
+            f" -- {name:<8} {len(htmls) / elapsed:,.0f} docs/s, {size_mb / elapsed:.1f} MB/s, "
+            f"{mismatches} documentos con terminos distintos a soup, "
+            f"{prolog_mismatches} con declaracion XML"
+        )
+
+
+if __name__ == "__main__":
+    main()
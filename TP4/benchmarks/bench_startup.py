@@ -0,0 +1,53 @@
+import argparse
+import subprocess
+import sys
+import time
+
+
+# Cada medicion corre en un proceso nuevo, para incluir el costo de los imports
+# y de la carga de stopwords como lo ve un servidor que recien arranca.
+SNIPPETS = {
+    "TextProcessor": (
+        "from TP4.EJ1.tokenicer import TextProcessor\n" "TextProcessor()"
+    ),
+    "QueryProcessor": (
+        "from TP4.EJ2.queryProcessor import QueryProcessor\n" "QueryProcessor()"
+    ),
+    "TaatRetriever": (
+        "from pathlib import Path\n"
+        "from TP4.EJ2.taat import TaatRetriever\n"
+        "TaatRetriever(Path('.'), 0, loadIndexFromDisk=True)"
+    ),
+}
+
+
+def time_snippet(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mide el tiempo de arranque de los procesadores y del retriever"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--no-retriever",
+        action="store_true",
+        help="No medir TaatRetriever (requiere un indice en el directorio actual)",
+    )
+    args = parser.parse_args()
+
+    baseline = min(time_snippet("pass") for _ in range(args.repeat))
+    print(f"\nArranque del interprete: {baseline:.3f} s.\n")
+
+    for name, code in SNIPPETS.items():
+        if name == "TaatRetriever" and args.no_retriever:
+            continue
+        best = min(time_snippet(code) for _ in range(args.repeat))
+        print(f" -- {name:<15} {best:.3f} s. ({best - baseline:.3f} s. sobre el interprete)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+from TP4.EJ1.indexer import Indexer
+
+
+DOCUMENTS = [
+    ("uno", "<html><body>casa perro casa gato casa</body></html>"),
+    ("dos", "<html><body>perro perro raton</body></html>"),
+]
+
+
+def build(tmp_path, positional):
+    indexer = Indexer(index_dir=str(tmp_path), positional=positional)
+    indexer.index_documents(DOCUMENTS)
+    return indexer
+
+
+def test_bytes_per_posting_is_measured(tmp_path):
+    # Sin posiciones, cada posting ocupa term_id, doc_id y freq (u4).
+    indexer = build(tmp_path / "plano", positional=False)
+    assert indexer.peak_accumulator_postings == 5
+    assert indexer.accumulator_bytes_per_posting() == 12
+
+    # Con posiciones se suman los 4 bytes de cada una: 8 apariciones.
+    indexer = build(tmp_path / "posicional", positional=True)
+    assert indexer.accumulator_bytes_per_posting() == (5 * 12 + 8 * 4) / 5
@@ -0,0 +1,46 @@
+from collections import Counter
+from pathlib import Path
+import pytest
+from TP4.EJ1.extractors import EXTRACTORS, FIELDS, get_extractor
+from TP4.EJ1.tokenicer import tokenize
+
+
+# Los tres extractores tienen que producir los mismos terminos, en el texto
+# completo y en cada campo, para las paginas de tests/data/pages: declaracion
+# XML, entidades, script/style, comentarios y encabezados anidados.
+PAGES = sorted((Path(__file__).parent / "data" / "pages").glob("*.html"))
+
+
+def terms(text):
+    return Counter(tokenize(text))
+
+
+def extractor_or_skip(name):
+    try:
+        return get_extractor(name)
+    except ImportError:
+        pytest.skip(f"Extractor {name} no disponible")
+
+
+@pytest.mark.parametrize("page", PAGES, ids=lambda page: page.stem)
+@pytest.mark.parametrize("name", [name for name in EXTRACTORS if name != "soup"])
+def test_same_terms_as_soup(name, page):
+    reference = extractor_or_skip("soup")
+    extractor = extractor_or_skip(name)
+    ref_text, ref_fields = reference.extract_file_fields(page)
+    text, fields = extractor.extract_file_fields(page)
+
+    assert terms(text) == terms(ref_text)
+    assert terms(extractor.extract_file(page)) == terms(ref_text)
+    for field in FIELDS:
+        assert terms(fields[field]) == terms(ref_fields[field]), field
+
+
+def test_pages_cover_the_cases():
+    assert {page.stem for page in PAGES} >= {
+        "prolog",
+        "entities",
+        "script_style",
+        "comments",
+        "headings",
+    }
@@ -0,0 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+from TP4.EJ2.queryProcessor import QueryProcessor
+
+
+QUERIES = [f"machine learning query{i} python" for i in range(64)]
+
+
+def test_cache_from_many_threads():
+    processor = QueryProcessor(cache_size=16)
+    expected = {query: processor._analyze_query(query) for query in QUERIES}
+
+    def run(seed):
+        for i in range(400):
+            query = QUERIES[(seed * 7 + i * 13) % len(QUERIES)]
+            assert processor.process_query(query) == expected[query]
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(run, range(8)))
+    info = processor.cache_info()
+    assert info["hits"] + info["misses"] == 8 * 400
+    assert info["size"] <= 16
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from TP4.EJ1.runs import (
+    RUN_MAGIC,
+    ChunkCursor,
+    merge_chunks,
+    varint_decode,
+    varint_encode,
+    write_chunk,
+)
+
+
+NEAR_2_32 = [0, 1, 127, 128, 2**28 - 1, 2**28, 2**32 - 1, 2**32, 2**32 + 1, 2**35 - 1]
+
+
+def test_varint_round_trip_near_2_32():
+    data = varint_encode(NEAR_2_32)
+    values, used = varint_decode(data)
+    assert values.tolist() == NEAR_2_32
+    assert used == len(data)
+    # 2**32 - 1 y 2**32 ocupan 5 bytes: 7 bits por byte.
+    assert len(varint_encode([2**32 - 1])) == len(varint_encode([2**32])) == 5
+
+
+def test_varint_decode_cut_value():
+    data = varint_encode([5, 2**32 + 7])
+    for cut in range(1, 6):
+        values, used = varint_decode(data[:-cut])
+        assert values.tolist() == [5] and used == 1
+
+
+def make_chunk(path, records, compress, positions=None):
+    # records: lista de (term_id, doc_id, freq), en cualquier orden.
+    columns = np.array(records, dtype="u4").reshape(-1, 3).T
+    write_chunk(path, *columns, positions, path.with_suffix(".pos"), compress)
+    return path
+
+
+def merged(paths, buffer_size, positional=False):
+    positions_files = None
+    if positional:
+        positions_files = [path.with_suffix(".pos") for path in paths]
+    return [
+        (term_id, *(column.tolist() for column in columns))
+        for term_id, *columns in merge_chunks(paths, buffer_size, positions_files)
+    ]
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_empty_and_single_posting_runs(tmp_path, compress):
+    empty = make_chunk(tmp_path / "vacio.bin", [], compress)
+    single = make_chunk(tmp_path / "uno.bin", [(2**32 - 1, 2**32 - 1, 3)], compress)
+    if compress:
+        assert empty.read_bytes() == RUN_MAGIC
+    cursor = ChunkCursor(empty)
+    assert cursor.term_id is None
+    cursor.close()
+    assert merged([empty], 1) == []
+    for buffer_size in (1, 2, 1 << 20):
+        assert merged([empty, single, empty], buffer_size) == [
+            (2**32 - 1, [2**32 - 1], [3])
+        ]
+
+
+def random_chunks(tmp_path, compress, seed=0):
+    # Tres chunks con documentos entrelazados y un termino (el 0) con muchas
+    # postings, que con un buffer chico ocupa muchos bloques.
+    rng = np.random.default_rng(seed)
+    paths = []
+    for chunk in range(3):
+        records = [(0, doc_id, 1 + doc_id % 3) for doc_id in range(chunk, 900, 3)]
+        for _ in range(300):
+            records.append(
+                (
+                    int(rng.integers(1, 200)),
+                    int(rng.integers(0, 2**32)),
+                    int(rng.integers(1, 5)),
+                )
+            )
+        # Sin postings repetidas (mismo termino y documento).
+        unique = {(t, d): f for t, d, f in records}
+        records = [(t, d, f) for (t, d), f in unique.items()]
+        rng.shuffle(records)
+        positions = np.arange(sum(f for _, _, f in records), dtype="u4")
+        path = tmp_path / f"chunk{chunk}_{'z' if compress else 'r'}.bin"
+        paths.append(make_chunk(path, records, compress, positions))
+    return paths
+
+
+@pytest.mark.parametrize("buffer_size", [1, 3, 7, 64])
+def test_merge_with_tiny_buffer(tmp_path, buffer_size):
+    compressed = random_chunks(tmp_path, True)
+    raw = random_chunks(tmp_path, False)
+    expected = merged(raw, 1 << 20, positional=True)
+    assert expected[0][0] == 0 and len(expected[0][1]) == 900
+    assert merged(compressed, buffer_size, positional=True) == expected
+    assert merged(raw, buffer_size, positional=True) == expected
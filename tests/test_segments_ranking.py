@@ -0,0 +1,94 @@
+import random
+import pytest
+from TP4.EJ1.indexer import Indexer
+from TP4.EJ1.segments import SegmentedIndex
+from TP4.EJ2.taat import TaatRetriever
+from TP4.EJ4.daat import DaatRetriever
+
+
+# Un indice por segmentos con documentos borrados tiene que rankear igual que
+# un indice construido de cero solo con los documentos vivos.
+WORDS = [
+    "alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+    "india", "juliet", "kilo", "lima", "mike", "november", "oscar", "papa",
+]  # fmt: skip
+QUERIES = ["alpha bravo", "delta echo echo", "kilo", "lima mike november oscar"]
+
+
+def make_documents(n_docs, seed=0):
+    rng = random.Random(seed)
+    documents = []
+    for doc_id in range(n_docs):
+        words = rng.choices(WORDS[: rng.randint(4, len(WORDS))], k=rng.randint(5, 60))
+        html = f"<html><body>{' '.join(words)}</body></html>"
+        documents.append((f"doc{doc_id}", html))
+    return documents
+
+
+@pytest.fixture(scope="module")
+def indexes(tmp_path_factory):
+    documents = make_documents(60)
+    deleted = {"doc3", "doc17", "doc18", "doc40", "doc59"}
+
+    segmented = SegmentedIndex(
+        str(tmp_path_factory.mktemp("segments")), background_merges=False
+    )
+    for start in range(0, len(documents), 20):
+        segmented.add_documents(documents[start : start + 20])
+    for docname in deleted:
+        assert segmented.delete(docname) == 1
+
+    fresh = Indexer(index_dir=str(tmp_path_factory.mktemp("fresh")))
+    fresh.index_documents([doc for doc in documents if doc[0] not in deleted])
+    fresh.build_vocabulary()
+    fresh.load_index()
+    return segmented, fresh
+
+
+def ranking(results, top=10):
+    # (docname, score) ordenado por score y, en empates, por nombre; los
+    # doc_id no se comparan porque el indice nuevo los numera de nuevo.
+    results = sorted(
+        ((docname, round(score, 9)) for docname, _, score in results),
+        key=lambda result: (-result[1], result[0]),
+    )
+    return results[:top]
+
+
+@pytest.mark.parametrize("retriever", [TaatRetriever, DaatRetriever])
+@pytest.mark.parametrize("query", QUERIES)
+def test_bm25_after_deletes_matches_fresh_index(indexes, retriever, query):
+    segmented, fresh = indexes
+    assert segmented.getAvgDocLength() == pytest.approx(fresh.getAvgDocLength())
+    expected = retriever(
+        None, 0, loadIndexFromDisk=True, indexer=fresh, ranking="bm25"
+    ).searchQuery(query)
+    got = retriever(
+        None, 0, loadIndexFromDisk=True, indexer=segmented, ranking="bm25"
+    ).searchQuery(query)
+    assert ranking(got) == ranking(expected)
+
+
+def test_norms_after_delete_match_fresh_index(indexes, tmp_path):
+    # Las normas despues de un borrado no dependen de si ya se habian
+    # calculado antes: siempre usan el N y los df de los documentos vivos.
+    _, fresh = indexes
+    documents = make_documents(60)
+    segmented = SegmentedIndex(str(tmp_path), background_merges=False)
+    for start in range(0, len(documents), 20):
+        segmented.add_documents(documents[start : start + 20])
+    segmented.delete("doc3")
+    segmented.getDocNorms()
+    for docname in ("doc17", "doc18", "doc40", "doc59"):
+        segmented.delete(docname)
+
+    norms = segmented.getDocNorms()
+    fresh_norms = fresh.getDocNorms()
+    fresh_ids = {docname: doc_id for docname, doc_id in fresh.getAllDocsID()}
+    for docname, doc_id in segmented.getAllDocsID():
+        assert norms[doc_id] == pytest.approx(fresh_norms[fresh_ids[docname]])
+
+    expected = DaatRetriever(None, 0, loadIndexFromDisk=True, indexer=fresh)
+    got = DaatRetriever(None, 0, loadIndexFromDisk=True, indexer=segmented)
+    for query in QUERIES:
+        assert ranking(got.searchQuery(query)) == ranking(expected.searchQuery(query))
@@ -0,0 +1,43 @@
+import io
+from collections import Counter
+import pytest
+from TP2.EJ5.tokenicer import TextProcessor as JsonTextProcessor
+from TP4.EJ1.extractors import StreamingExtractor
+from TP4.EJ1.tokenicer import TextProcessor, tokenize
+
+
+# El HTML tiene una ñ y una á (dos bytes en UTF-8) y palabras largas, asi que
+# con bloques chicos hay caracteres y tokens partidos entre dos bloques. Los
+# nombres de tags, los atributos y el script no son texto del documento.
+HTML = (
+    '<html><head><title>Mañana lluviosa</title>'
+    '<script>var palabras = "nunca indexar";</script></head>'
+    '<body class="contenido"><p>Pequeño pingüino caminando sobre la montaña '
+    "nevada, <b>muy</b>&nbsp;despacio. Canción, canción y más canción.</p>"
+    "<!-- comentario escondido --></body></html>"
+)
+DATA = HTML.encode("utf-8")
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 3, 5, 7, 64, 1 << 16])
+def test_count_stream_matches_count(block_size):
+    processor = TextProcessor()
+    expected = processor.count(StreamingExtractor().extract(HTML))
+    assert processor.count_stream(io.BytesIO(DATA), block_size) == expected
+    assert processor.count_stream(io.StringIO(HTML), block_size) == expected
+    assert "script" not in expected and "contenido" not in expected
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 1 << 16])
+def test_process_stream_counts_extracted_text(block_size):
+    processor = JsonTextProcessor()
+    processor.process_stream(io.BytesIO(DATA), "0", block_size)
+    expected = Counter(
+        word
+        for word in tokenize(StreamingExtractor().extract(HTML))
+        if word not in processor.stopwords
+    )
+    got = {
+        term: data["apariciones"]["0"] for term, data in processor.json_data.items()
+    }
+    assert got == dict(expected)
@@ -0,0 +1,41 @@
+import pytest
+from TP4.EJ1.indexer import Indexer
+from TP4.EJ2.taat import TaatRetriever
+
+
+DOCUMENTS = [
+    ("cerca", "<html><body>machine deep learning</body></html>"),
+    ("lejos", "<html><body>machine one two three four five deep</body></html>"),
+    ("rifle", "<html><body>rifle shop</body></html>"),
+    ("nada", "<html><body>nothing relevant here</body></html>"),
+]
+
+
+@pytest.fixture(scope="module")
+def taat(tmp_path_factory):
+    indexer = Indexer(index_dir=str(tmp_path_factory.mktemp("index")), positional=True)
+    indexer.index_documents(DOCUMENTS)
+    indexer.build_vocabulary()
+    return TaatRetriever(None, 0, loadIndexFromDisk=True, indexer=indexer)
+
+
+def docnames(taat, query):
+    return {docname for docname, _ in taat.getQueryRanking(query)}
+
+
+def test_near(taat):
+    assert docnames(taat, "machine NEAR/2 deep") == {"cerca"}
+    assert docnames(taat, "machine NEAR/6 deep") == {"cerca", "lejos"}
+
+
+def test_near_inside_group(taat):
+    assert docnames(taat, "(machine NEAR/2 deep OR rifle)") == {"cerca", "rifle"}
+    assert docnames(taat, "(machine NEAR/6 deep) AND NOT (rifle OR learning)") == {
+        "lejos"
+    }
+
+
+def test_near_operand_is_not_a_parenthesis(taat):
+    query, operators = taat.extractPositionalOperators("(machine NEAR/2 deep)")
+    assert query == "(_op0_)"
+    assert operators == {"_op0_": ("near", 2, "machine", "deep")}
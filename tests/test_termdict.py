@@ -0,0 +1,34 @@
+from TP4.EJ1.indexer import Indexer
+from TP4.EJ1.termdict import TermDictionary, write_term_dictionary
+
+
+# Tokens de mas de 65535 bytes en UTF-8: no entran en un largo u2. Los dos
+# largos comparten un prefijo tambien mayor a 65535 bytes.
+LONG = "ñ" * 40000
+TERMS = [LONG, LONG + "a", LONG + "b", "corto", "zeta"]
+
+
+def test_long_terms_round_trip(tmp_path):
+    vocab = {term: (i * 8, i + 1) for i, term in enumerate(TERMS)}
+    terms_path, index_path = tmp_path / "terms.bin", tmp_path / "terms.idx"
+    write_term_dictionary(terms_path, index_path, vocab, block_size=2)
+    terms = TermDictionary(terms_path, index_path)
+    assert len(terms) == len(TERMS)
+    assert dict(terms.items()) == vocab
+    for term, value in vocab.items():
+        assert terms[term] == value
+    assert [term for term, _ in terms.prefix(LONG)] == sorted(TERMS[:3])
+
+
+def test_build_vocabulary_with_long_token(tmp_path):
+    documents = [
+        ("largo", f"<html><body>{LONG} casa {LONG}</body></html>"),
+        ("corto", "<html><body>casa perro</body></html>"),
+    ]
+    indexer = Indexer(index_dir=str(tmp_path))
+    indexer.index_documents(documents)
+    indexer.build_vocabulary()
+    indexer.load_index()
+    doc_ids, freqs = indexer.get_postings(LONG)
+    assert len(doc_ids) == 1 and list(freqs) == [2]
+    assert len(indexer.get_postings("casa")[0]) == 2
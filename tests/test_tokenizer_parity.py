@@ -0,0 +1,49 @@
+import locale
+import random
+import shutil
+from collections import Counter
+import pytest
+from TP4.EJ1.tokenicer import TextProcessor, tokenize
+
+
+# tokenize() reemplaza al pipeline `tr | sed | sort` de _sort_words_unix y
+# tiene que devolver los mismos tokens (el orden no importa: el indexador los
+# cuenta). El alfabeto mezcla mayusculas, acentos, caracteres que no son de
+# ningun token y distintos separadores.
+ALPHABET = "abcxyzABCXYZáéíóúñüÁÉÑÜçß€0123456789 .,;:!?-_'\"()\t\n"
+
+
+def has_utf8_locale():
+    # _sort_words_unix corre el pipeline con LC_ALL=C.UTF-8; si el sistema no
+    # tiene ese locale, tr y sed vuelven a trabajar byte a byte.
+    current = locale.setlocale(locale.LC_CTYPE)
+    try:
+        locale.setlocale(locale.LC_CTYPE, "C.UTF-8")
+    except locale.Error:
+        return False
+    finally:
+        locale.setlocale(locale.LC_CTYPE, current)
+    return True
+
+
+pytestmark = [
+    pytest.mark.skipif(
+        any(shutil.which(tool) is None for tool in ("cat", "tr", "sed", "sort")),
+        reason="Requiere cat, tr, sed y sort",
+    ),
+    pytest.mark.skipif(not has_utf8_locale(), reason="Requiere el locale C.UTF-8"),
+]
+
+
+def unix_tokens(processor, text):
+    # El pipeline devuelve [""] para un texto sin tokens.
+    return Counter(word for word in processor._sort_words_unix(text) if word)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_tokenize_matches_unix_pipeline(seed):
+    rng = random.Random(seed)
+    processor = TextProcessor()
+    for _ in range(40):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 400)))
+        assert Counter(tokenize(text)) == unix_tokens(processor, text), text